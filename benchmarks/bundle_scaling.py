@@ -0,0 +1,109 @@
+"""
+Bundle scaling benchmark.
+
+Adds 1, 100 and 10,000 Sigma rules to a single `Bundler` and reports, per
+rule count, the time to bundle the rules, the time to serialize the bundle
+and the size of the serialized bundle. Per-rule figures should stay flat as
+the rule count grows, a growing per-rule figure means bundling is
+super-linear.
+
+Usage:
+
+    python benchmarks/bundle_scaling.py
+    python benchmarks/bundle_scaling.py --rules 1 100 1000 --json scaling.json
+"""
+
+import argparse
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import sys
+import time
+import uuid
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import offline
+
+
+def make_detections(count):
+    from txt2detection.models import SigmaRuleDetection
+
+    return [
+        SigmaRuleDetection(
+            title=f"Rule {i}",
+            description=f"Detects connections to suspicious host {i}",
+            id=uuid.uuid5(uuid.NAMESPACE_URL, f"bundle-scaling/{i}"),
+            detection=dict(
+                condition="selection",
+                selection={"DestinationHostname": f"host-{i}.example.com"},
+            ),
+            logsource=dict(category="network-connection", product="windows"),
+            tags=["tlp.clear"],
+            level="medium",
+        )
+        for i in range(count)
+    ]
+
+
+def run(count):
+    from txt2detection.bundler import Bundler
+
+    detections = make_detections(count)
+    bundler = Bundler(
+        "bundle scaling",
+        None,
+        "clear",
+        "bundle scaling benchmark",
+        [],
+        created=datetime(2025, 1, 1, tzinfo=UTC),
+        report_id=str(uuid.uuid5(uuid.NAMESPACE_URL, f"bundle-scaling/{count}")),
+        external_refs=[dict(source_name="benchmark", external_id="bundle-scaling")],
+        reference_urls=["https://example.com/report"],
+    )
+    t = time.perf_counter()
+    for detection in detections:
+        bundler.add_rule_indicator(detection)
+    bundle_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    serialized = bundler.to_json()
+    serialize_s = time.perf_counter() - t
+
+    indicators = bundler.objects_by_type["indicator"]
+    return dict(
+        rules=count,
+        bundle_s=round(bundle_s, 4),
+        serialize_s=round(serialize_s, 4),
+        bundle_bytes=len(serialized),
+        bundle_ms_per_rule=round(bundle_s * 1000 / count, 4),
+        serialize_ms_per_rule=round(serialize_s * 1000 / count, 4),
+        bytes_per_rule=len(serialized) // count,
+        max_indicator_refs=max(len(i["external_references"]) for i in indicators),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rules", type=int, nargs="+", default=[1, 100, 10_000])
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    args = parser.parse_args()
+
+    offline.install_http()
+    results = [run(count) for count in args.rules]
+    print(
+        f"{'rules':>7} {'bundle (s)':>11} {'ms/rule':>8} {'serialize (s)':>14}"
+        f" {'ms/rule':>8} {'bytes/rule':>11} {'max refs':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['rules']:>7} {r['bundle_s']:>11.3f} {r['bundle_ms_per_rule']:>8.3f}"
+            f" {r['serialize_s']:>14.3f} {r['serialize_ms_per_rule']:>8.3f}"
+            f" {r['bytes_per_rule']:>11} {r['max_indicator_refs']:>9}"
+        )
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+
+
+if __name__ == "__main__":
+    main()
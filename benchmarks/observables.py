@@ -0,0 +1,135 @@
+"""
+Observable extraction benchmark.
+
+Scales the detection of `tests/files/sigma-rule-observables.yml` to a
+growing number of selections and times `observables.find_stix_observables`
+against the implementation it replaced, which searched every key and value
+with every pattern of `STIX_PATTERNS_KEYS` and `STIX_PATTERNS_VALUES`
+and recursed into every value once per STIX type. Both use the memoized
+`filter_out()` validators, which are filled by a first run so the timings
+compare the pattern matching and the traversal. Reports the time per rule
+of each and checks that both find the same observables.
+
+Also nests the selection in detections of growing depth: the time per
+value should stay flat with the current traversal, while the previous one
+grows with the 17th power of the depth, so it is only run up to
+`--previous-max-depth`.
+
+Usage:
+
+    python benchmarks/observables.py
+    python benchmarks/observables.py --selections 1 10 100 --repeat 20
+    python benchmarks/observables.py --depths 1 2 3 50 500 --previous-max-depth 3
+"""
+
+import argparse
+from pathlib import Path
+import re
+import time
+
+from txt2detection import observables, sigma_yaml
+
+RULE_PATH = (
+    Path(__file__).resolve().parent.parent / "tests/files/sigma-rule-observables.yml"
+)
+
+
+def previous_find_stix_observables(detection, matches=None):
+    if matches is None:
+        matches = []
+
+    if isinstance(detection, dict):
+        for key, value in detection.items():
+            for stix_type, key_pattern in observables.STIX_PATTERNS_KEYS.items():
+                value_patterns = observables.STIX_PATTERNS_VALUES.get(stix_type, [])
+                if re.search(key_pattern, key, re.IGNORECASE):
+                    for pattern in value_patterns:
+                        if isinstance(value, str) and re.search(
+                            pattern, value, re.IGNORECASE
+                        ):
+                            if observables.filter_out(stix_type, value):
+                                matches.append((stix_type, value))
+                previous_find_stix_observables(value, matches)
+            previous_find_stix_observables(value, matches)
+    elif isinstance(detection, list):
+        for item in detection:
+            previous_find_stix_observables(item, matches)
+    elif isinstance(detection, str):
+        for stix_type, value_patterns in observables.STIX_PATTERNS_VALUES.items():
+            for pattern in value_patterns:
+                if re.search(pattern, detection, re.IGNORECASE):
+                    if observables.filter_out(stix_type, detection):
+                        matches.append((stix_type, detection))
+    return matches
+
+
+def scaled_detection(selections):
+    detection = sigma_yaml.load(RULE_PATH.read_text())["detection"]
+    values = detection.pop("selection")
+    for i in range(selections):
+        detection[f"selection_{i}"] = values + [
+            f"10.0.{i // 256 % 256}.{i % 256}",
+            f"\\Tools\\tool{i}.exe",
+            "powershell -nop -w hidden -enc",
+            "rundll32.exe",
+        ]
+    detection["condition"] = "1 of selection_*"
+    return detection
+
+
+def nested_detection(depth):
+    detection = sigma_yaml.load(RULE_PATH.read_text())["detection"]
+    node = detection
+    for i in range(depth):
+        node["selection"] = node = {
+            "DestinationIp": f"10.0.{i // 256 % 256}.{i % 256}",
+            "Image|endswith": f"\\Tools\\tool{i}.exe",
+        }
+    return detection
+
+
+def ms_per_rule(find, detection, repeat):
+    find(detection)  # fills the filter_out() cache
+    t = time.perf_counter()
+    for _ in range(repeat):
+        matches = find(detection)
+    return (time.perf_counter() - t) * 1000 / repeat, matches
+
+
+def compare(label, size, detection, repeat, run_previous=True):
+    compiled, matches = ms_per_rule(
+        observables.find_stix_observables, detection, repeat
+    )
+    previous = "-"
+    if run_previous:
+        previous, expected = ms_per_rule(
+            previous_find_stix_observables, detection, repeat
+        )
+        assert set(matches) == set(expected), f"{label} {size}: other observables"
+        previous = f"{previous:,.2f}"
+    print(f"{label:<10} {size:>6} {previous:>19} {compiled:>18,.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--selections", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 2, 3, 10, 100, 500])
+    parser.add_argument("--previous-max-depth", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'':<10} {'':>6} {'previous (ms/rule)':>19} {'current (ms/rule)':>18}")
+    for selections in args.selections:
+        compare("selections", selections, scaled_detection(selections), args.repeat)
+    for depth in args.depths:
+        compare(
+            "depth",
+            depth,
+            nested_detection(depth),
+            args.repeat,
+            run_previous=depth <= args.previous_max_depth,
+        )
+
+
+if __name__ == "__main__":
+    main()
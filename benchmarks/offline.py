@@ -0,0 +1,124 @@
+"""
+Offline stubs shared by the benchmarks.
+
+`install_http()` patches the transport layer of `requests` so that every HTTP
+call txt2detection makes (CTI Butler, Vulmatch, GitHub-hosted resources) is
+answered locally, `install_llm()` replaces LLM calls with a canned detection
+so the AI modes can be timed without credentials.
+"""
+
+import json
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+from requests.adapters import HTTPAdapter
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+TEST_FILES = REPO_ROOT / "tests/files"
+
+ATTACK_VERSION = "17.1"
+
+
+def _response(request, status_code, body):
+    resp = requests.Response()
+    resp.status_code = status_code
+    resp._content = json.dumps(body).encode()
+    resp.headers["Content-Type"] = "application/json"
+    resp.url = request.url
+    resp.request = request
+    return resp
+
+
+def fake_send(adapter, request, *args, **kwargs):
+    from txt2detection.resources import CachedResource
+
+    url = request.url
+    for resource in CachedResource.registry.values():
+        if url == resource.url and resource.snapshot:
+            return _response(request, 200, resource._read_snapshot())
+    if "/versions/installed/" in url:
+        return _response(request, 200, {"latest": ATTACK_VERSION})
+    if "/objects/" in url:
+        return _response(
+            request,
+            200,
+            {
+                "objects": [],
+                "page_size": 1000,
+                "page_number": 1,
+                "page_results_count": 0,
+                "total_results_count": 0,
+            },
+        )
+    if "/versions/available/" in url:
+        return _response(request, 200, [ATTACK_VERSION])
+    return _response(request, 404, {"detail": "not found"})
+
+
+def canned_detections(*args, **kwargs):
+    from txt2detection.__main__ import get_sigma_detections
+    from txt2detection.models import AIDetection, DetectionContainer
+
+    rule = get_sigma_detections(
+        (TEST_FILES / "sigma-rule-observables.yml").read_text()
+    )
+    detection = AIDetection.model_validate(
+        dict(
+            rule.model_dump(
+                include=[
+                    "title",
+                    "description",
+                    "detection",
+                    "logsource",
+                    "falsepositives",
+                    "tags",
+                ]
+            ),
+            level="medium",
+            falsepositives=rule.falsepositives or [],
+            indicator_types=["malicious-activity"],
+        )
+    )
+    return DetectionContainer(success=True, detections=[detection])
+
+
+def _start(patchers):
+    for patcher in patchers:
+        patcher.start()
+    return patchers
+
+
+def install_http():
+    """
+    Answer every HTTP request locally, does not import txt2detection
+    """
+    os.environ.setdefault("CTIBUTLER_BASE_URL", "http://ctibutler.invalid/api/")
+    os.environ.setdefault("VULMATCH_BASE_URL", "http://vulmatch.invalid/api/")
+    return _start([patch.object(HTTPAdapter, "send", fake_send)])
+
+
+def install_llm():
+    """
+    Replace LLM calls with a canned detection, imports the AI extractor base
+    (and so llama-index)
+    """
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("INPUT_TOKEN_LIMIT", "100000")
+    return _start(
+        [
+            patch(
+                "txt2detection.ai_extractor.base.BaseAIExtractor.get_detections",
+                canned_detections,
+            ),
+            patch(
+                "txt2detection.ai_extractor.base.BaseAIExtractor.count_tokens",
+                lambda self, text: len(text) // 4,
+            ),
+            patch(
+                "txt2detection.ai_extractor.base.BaseAIExtractor._check_credential",
+                lambda self: True,
+            ),
+        ]
+    )
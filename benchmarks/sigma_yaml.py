@@ -0,0 +1,65 @@
+"""
+Sigma YAML benchmark.
+
+Loads and dumps the Sigma rules in `tests/files/`, repeated up to a few
+thousand rules, with the pure-Python PyYAML implementation and with the
+libyaml path in `txt2detection/sigma_yaml.py`, and reports rules/second for
+each. Also checks that both paths dump byte-identical rules.
+
+Usage:
+
+    python benchmarks/sigma_yaml.py
+    python benchmarks/sigma_yaml.py --rules 10000
+"""
+
+import argparse
+import itertools
+import os
+from pathlib import Path
+import time
+
+from txt2detection import sigma_yaml
+
+RULES_DIR = Path(__file__).resolve().parent.parent / "tests/files"
+
+
+def load_rules(count):
+    texts = [path.read_text() for path in sorted(RULES_DIR.glob("*.yml"))]
+    return list(itertools.islice(itertools.cycle(texts), count))
+
+
+def rules_per_second(texts, pure):
+    os.environ["TXT2DETECTION_PURE_YAML"] = "true" if pure else ""
+    t = time.perf_counter()
+    rules = [sigma_yaml.load(text) for text in texts]
+    load_s = time.perf_counter() - t
+
+    t = time.perf_counter()
+    dumped = [sigma_yaml.dump(rule, sort_keys=False, indent=4) for rule in rules]
+    dump_s = time.perf_counter() - t
+    return len(texts) / load_s, len(texts) / dump_s, dumped
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rules", type=int, default=5000)
+    args = parser.parse_args()
+    if sigma_yaml.CDumper is None:
+        parser.exit(1, "PyYAML was built without libyaml, nothing to compare\n")
+
+    texts = load_rules(args.rules)
+    pure_load, pure_dump, expected = rules_per_second(texts, pure=True)
+    fast_load, fast_dump, dumped = rules_per_second(texts, pure=False)
+    assert dumped == expected, "libyaml output differs from pure-Python output"
+
+    print(f"{len(texts)} rules from {RULES_DIR}")
+    print(f"{'':<6} {'pure (rules/s)':>15} {'libyaml (rules/s)':>18} {'speedup':>8}")
+    for name, pure, fast in [
+        ("load", pure_load, fast_load),
+        ("dump", pure_dump, fast_dump),
+    ]:
+        print(f"{name:<6} {pure:>15,.0f} {fast:>18,.0f} {fast / pure:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+Cold-start benchmark for the txt2detection CLI.
+
+Every mode in `txt2detection/__main__.py` is run in a fresh interpreter with
+HTTP and LLM calls stubbed (see `offline.py`), reporting
+
+* import time of `txt2detection.__main__`
+* time-to-first-rule: from process spawn until the first indicator is bundled
+* total wall time and peak RSS
+* the slowest modules imported during the run (from `python -X importtime`)
+
+Usage:
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --modes sigma --repeat 10 --json startup.json
+    python benchmarks/startup.py --compare startup.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import os
+from pathlib import Path
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import offline
+
+MODES = {
+    "sigma": [
+        "sigma",
+        "--name",
+        "benchmark",
+        "--sigma_file",
+        str(offline.TEST_FILES / "sigma-rule-master.yml"),
+    ],
+    "file": [
+        "file",
+        "--name",
+        "benchmark",
+        "--ai_provider",
+        "openai",
+        "--input_file",
+        str(offline.TEST_FILES / "EC2-exfil.txt"),
+    ],
+    "text": [
+        "text",
+        "--name",
+        "benchmark",
+        "--ai_provider",
+        "openai",
+        "--input_text",
+        (offline.TEST_FILES / "EC2-exfil.txt").read_text()[:2000],
+    ],
+    "check-credentials": ["check-credentials"],
+    "refresh-cache": ["refresh-cache"],
+}
+
+
+def child(mode, result_path, argv):
+    """
+    Runs inside the benchmarked interpreter
+    """
+    import atexit
+    import resource
+
+    spawned_at = float(os.environ["BENCH_SPAWNED_AT"])
+    result = dict(mode=mode)
+
+    offline.install_http()
+    t = time.perf_counter()
+    import txt2detection.__main__ as cli
+
+    result["import_s"] = time.perf_counter() - t
+    if mode in ["file", "text", "check-credentials"]:
+        offline.install_llm()
+
+    add_rule_indicator = cli.Bundler.add_rule_indicator
+
+    def timed_add_rule_indicator(self, detection):
+        retval = add_rule_indicator(self, detection)
+        result.setdefault("first_rule_s", time.time() - spawned_at)
+        return retval
+
+    cli.Bundler.add_rule_indicator = timed_add_rule_indicator
+
+    @atexit.register
+    def report():
+        result["max_rss_mb"] = (
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        )
+        Path(result_path).write_text(json.dumps(result))
+
+    sys.argv = ["txt2detection", *argv]
+    args = cli.parse_args()
+    cli.main(args)
+
+
+def run_child(mode, workdir, env, python_args=()):
+    result_path = Path(workdir) / f"result-{mode}.json"
+    result_path.unlink(missing_ok=True)
+    spawned_at = time.time()
+    proc = subprocess.run(
+        [sys.executable, *python_args, __file__, "--child", mode, str(result_path), "--"]
+        + MODES[mode],
+        cwd=workdir,
+        env=dict(env, BENCH_SPAWNED_AT=str(spawned_at)),
+        capture_output=True,
+        text=True,
+    )
+    wall_s = time.time() - spawned_at
+    if not result_path.exists():
+        raise RuntimeError(f"{mode} failed:\n{proc.stderr[-3000:]}")
+    result = json.loads(result_path.read_text())
+    result.update(wall_s=wall_s, exit_code=proc.returncode)
+    return result, proc.stderr
+
+
+def parse_importtime(stderr, top=10):
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    by_package = {}
+    for name, self_us, _ in modules:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return dict(
+        modules_imported=len(modules),
+        slowest_packages_ms={
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda x: -x[1])[:top]
+        },
+    )
+
+
+def benchmark(modes, repeat):
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        env = dict(
+            os.environ,
+            TXT2DETECTION_CACHE_DIR=str(Path(workdir) / "cache"),
+            PYTHONPATH=os.pathsep.join(
+                filter(None, [str(offline.REPO_ROOT), os.environ.get("PYTHONPATH")])
+            ),
+        )
+        # populate the resource cache once, so runs measure a warm cache
+        run_child("refresh-cache", workdir, env)
+        for mode in modes:
+            runs = [run_child(mode, workdir, env)[0] for _ in range(repeat)]
+            _, stderr = run_child(mode, workdir, env, python_args=["-X", "importtime"])
+            summary = dict(exit_code=runs[-1]["exit_code"])
+            for key in ["import_s", "first_rule_s", "wall_s", "max_rss_mb"]:
+                values = [r[key] for r in runs if key in r]
+                if values:
+                    summary[key] = round(statistics.median(values), 4)
+            summary.update(parse_importtime(stderr))
+            results[mode] = summary
+    return results
+
+
+def print_results(results):
+    print(
+        f"{'mode':<18} {'import (s)':>10} {'first rule (s)':>15} {'wall (s)':>9} {'peak RSS (MB)':>14}"
+    )
+    for mode, r in results.items():
+        print(
+            f"{mode:<18} {r['import_s']:>10.3f} {r.get('first_rule_s', float('nan')):>15.3f}"
+            f" {r['wall_s']:>9.3f} {r['max_rss_mb']:>14.1f}"
+        )
+    for mode, r in results.items():
+        print(f"\n{mode}: {r['modules_imported']} modules imported, slowest packages (ms):")
+        for package, ms in r["slowest_packages_ms"].items():
+            print(f"    {package:<30} {ms:>8.1f}")
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for mode, r in results.items():
+        if mode not in baseline:
+            continue
+        for key in ["import_s", "first_rule_s", "wall_s", "max_rss_mb"]:
+            old, new = baseline[mode].get(key), r.get(key)
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{mode}.{key}: {old} -> {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="write results to this file")
+    parser.add_argument(
+        "--compare", type=Path, help="fail if slower than the results in this file"
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown when using --compare",
+    )
+    args = parser.parse_args()
+
+    results = benchmark(args.modes, args.repeat)
+    print_results(results)
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=4))
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("\nstartup regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--child"]:
+        mode, result_path, _, *argv = sys.argv[2:]
+        child(mode, result_path, argv)
+    else:
+        main()
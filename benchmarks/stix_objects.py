@@ -0,0 +1,99 @@
+"""
+STIX object construction benchmark.
+
+Builds the indicators and relationships txt2detection generates, through the
+trusted fast path (`stix_builder.build`) and through stix2 with full
+validation (`TXT2DETECTION_STRICT_STIX=true`), and reports objects/second for
+each.
+
+Usage:
+
+    python benchmarks/stix_objects.py
+    python benchmarks/stix_objects.py --objects 20000
+"""
+
+import argparse
+from datetime import UTC, datetime
+import os
+import time
+import uuid
+
+from stix2 import Indicator, Relationship
+
+from txt2detection import stix_builder
+
+CREATED = datetime(2025, 1, 1, tzinfo=UTC)
+IDENTITY = "identity--a4d70b75-6f4a-5d19-9137-da863edd33d7"
+MARKINGS = [
+    "marking-definition--94868c89-83c2-464b-929b-a1a8aa3c8487",
+    "marking-definition--a4d70b75-6f4a-5d19-9137-da863edd33d7",
+]
+
+
+def indicator(i):
+    return dict(
+        id=f"indicator--{uuid.uuid5(uuid.NAMESPACE_URL, str(i))}",
+        created_by_ref=IDENTITY,
+        created=CREATED,
+        modified=CREATED,
+        name=f"Rule {i}",
+        description="Detects something suspicious",
+        labels=["benchmark"],
+        pattern_type="sigma",
+        pattern=f"title: Rule {i}\ndetection:\n    condition: selection\n",
+        valid_from=CREATED,
+        object_marking_refs=MARKINGS,
+        external_references=[
+            dict(source_name="rule_md5_hash", external_id=f"{i:032x}"),
+            dict(source_name="mitre-attack", external_id="T1190"),
+        ],
+        extensions={
+            "extension-definition--c16c84c5-9cfd-50a2-970d-09c0ff2700f7": {
+                "extension_type": "toplevel-property-extension"
+            }
+        },
+        x_sigma_type="base",
+        x_sigma_level="medium",
+        x_sigma_status="experimental",
+        x_sigma_falsepositives=["unknown"],
+    )
+
+
+def relationship(i):
+    return dict(
+        id=f"relationship--{uuid.uuid5(uuid.NAMESPACE_URL, str(i))}",
+        source_ref=f"indicator--{uuid.uuid5(uuid.NAMESPACE_URL, str(i))}",
+        target_ref="attack-pattern--1ecb2399-e8ba-4f6b-8ba7-5c27d49405cf",
+        relationship_type="related-to",
+        created_by_ref=IDENTITY,
+        description=f"Rule {i} related-to T1190",
+        created=CREATED,
+        modified=CREATED,
+        object_marking_refs=MARKINGS,
+        external_references=[dict(source_name="mitre-attack", external_id="T1190")],
+    )
+
+
+def objects_per_second(cls, make, count, strict):
+    os.environ["TXT2DETECTION_STRICT_STIX"] = "true" if strict else ""
+    properties = [make(i) for i in range(count)]
+    t = time.perf_counter()
+    for p in properties:
+        stix_builder.build(cls, **p)
+    return count / (time.perf_counter() - t)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--objects", type=int, default=5000)
+    args = parser.parse_args()
+
+    print(f"{'object':<14} {'stix2 (obj/s)':>14} {'fast path (obj/s)':>18} {'speedup':>8}")
+    for cls, make in [(Indicator, indicator), (Relationship, relationship)]:
+        strict = objects_per_second(cls, make, args.objects, strict=True)
+        fast = objects_per_second(cls, make, args.objects, strict=False)
+        print(f"{cls._type:<14} {strict:>14,.0f} {fast:>18,.0f} {fast / strict:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
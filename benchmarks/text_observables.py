@@ -0,0 +1,105 @@
+"""
+Text observable extraction benchmark.
+
+Writes a synthetic threat report of `--size` MB (prose with IP addresses,
+domains, URLs, e-mail addresses and hashes mixed in) to a temporary file,
+then streams it through `observables.iter_text_observables` with each
+`--chunk-size` and reports throughput in MB/s and, in a separate traced
+run, the peak memory used while scanning. Also checks that every chunk size
+finds the same observables.
+
+Usage:
+
+    python benchmarks/text_observables.py
+    python benchmarks/text_observables.py --size 100 --chunk-size 65536 1048576
+    python benchmarks/text_observables.py --ioc-rate 0.05
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import tracemalloc
+
+from txt2detection import observables
+
+WORDS = (
+    "the actor used a loader to stage payloads and moved laterally before "
+    "exfiltrating data over encrypted channels rundll32.exe powershell.exe"
+).split()
+
+
+def make_ioc(rng: random.Random):
+    n = rng.randrange(5000)
+    return rng.choice(
+        [
+            f"10.{n // 256 % 256}.{n % 256}.{rng.randrange(1, 255)}",
+            f"c2-{n}.example.com",
+            f"https://cdn-{n}.example.net/payload/{n}.bin",
+            f"ops{n}@example.org",
+            f"{rng.getrandbits(128):032x}",
+            f"{rng.getrandbits(256):064x}",
+        ]
+    )
+
+
+def write_report(f, size_mb, ioc_rate, seed=0):
+    rng = random.Random(seed)
+    written = 0
+    while written < size_mb * 1024 * 1024:
+        line = " ".join(
+            make_ioc(rng) if rng.random() < ioc_rate else rng.choice(WORDS)
+            for _ in range(rng.randrange(5, 25))
+        )
+        written += f.write(line + ".\n")
+    f.flush()
+    return written
+
+
+def scan(path, chunk_size, trace=False):
+    if trace:
+        tracemalloc.start()
+    t = time.perf_counter()
+    with open(path) as f:
+        found = list(observables.iter_text_observables(f, chunk_size=chunk_size))
+    seconds = time.perf_counter() - t
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return found, peak
+    return found, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--size", type=int, default=20, help="report size in MB")
+    parser.add_argument(
+        "--ioc-rate", type=float, default=0.01, help="share of words that are IOCs"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        nargs="+",
+        default=[1 << 16, 1 << 20, 1 << 22],
+    )
+    args = parser.parse_args()
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as f:
+        size = write_report(f, args.size, args.ioc_rate)
+        print(f"{size / 1024 / 1024:.1f} MB report")
+        print(f"{'chunk size':>10} {'MB/s':>8} {'peak memory (MB)':>17} {'observables':>12}")
+        expected = None
+        for chunk_size in args.chunk_size:
+            found, seconds = scan(f.name, chunk_size)
+            _, peak = scan(f.name, chunk_size, trace=True)
+            if expected is None:
+                expected = found
+            assert found == expected, f"chunk size {chunk_size} found other observables"
+            print(
+                f"{chunk_size:>10} {size / 1024 / 1024 / seconds:>8.1f}"
+                f" {peak / 1024 / 1024:>17.1f} {len(found):>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,13 @@ from txt2detection.bundler import Bundler
 from datetime import datetime
 
 
+@pytest.fixture(autouse=True)
+def isolated_resources(tmp_path, monkeypatch):
+    # no test reads or writes the user's cache or fetches remote resources,
+    # tests of the fetching itself unset TXT2DETECTION_OFFLINE
+    monkeypatch.setenv("TXT2DETECTION_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setenv("TXT2DETECTION_OFFLINE", "1")
+
 
 @pytest.fixture
 def bundler_instance():
@@ -0,0 +1,61 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from txt2detection import attack_index
+from txt2detection.attack_index import AttackIndex
+from txt2detection.bundler import Bundler
+
+BUNDLE_PATH = Path(__file__).parent.parent / "files/attack-enterprise-bundle.json"
+
+
+@pytest.fixture
+def index():
+    return AttackIndex.from_file(BUNDLE_PATH)
+
+
+@pytest.fixture
+def local_bundle(monkeypatch):
+    monkeypatch.setenv("ATTACK_ENTERPRISE_BUNDLE", str(BUNDLE_PATH))
+    monkeypatch.delenv("CTIBUTLER_BASE_URL", raising=False)
+    yield
+    attack_index._index = None
+
+
+def test_index_version(index):
+    assert index.version == "17.1"
+
+
+def test_index_by_external_id(index):
+    assert [obj["name"] for obj in index.get_objects(["T1190", "ta0002", "T1059.001"])] == [
+        "Exploit Public-Facing Application",
+        "Execution",
+        "PowerShell",
+    ]
+    assert index.get_objects(["T9999"]) == []
+
+
+def test_index_skips_revoked_and_deprecated(index):
+    assert index.get_objects(["T1159", "T1025"]) == []
+
+
+def test_get_index_not_configured(monkeypatch):
+    monkeypatch.delenv("ATTACK_ENTERPRISE_BUNDLE", raising=False)
+    assert attack_index.get_index() is None
+
+
+def test_get_index_is_loaded_once(local_bundle):
+    with patch.object(
+        AttackIndex, "from_file", wraps=AttackIndex.from_file
+    ) as mock_from_file:
+        assert attack_index.get_index() is attack_index.get_index()
+        mock_from_file.assert_called_once()
+
+
+def test_bundler_uses_local_index(local_bundle, bundler_instance):
+    with patch.object(Bundler, "_get_objects") as mock_get_objects:
+        objects = bundler_instance.get_attack_objects(["T1190", "TA0001"])
+        assert Bundler.get_attack_version() == "17.1"
+        mock_get_objects.assert_not_called()
+    assert [obj["type"] for obj in objects] == ["attack-pattern", "x-mitre-tactic"]
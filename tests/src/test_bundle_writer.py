@@ -0,0 +1,99 @@
+import gzip
+import json
+from unittest.mock import patch
+
+import pytest
+
+from txt2detection.bundle_writer import BundleWriter
+
+
+@pytest.fixture
+def filled_bundler(bundler_instance):
+    bundler_instance.add_ref(
+        {"type": "indicator", "id": "indicator--1", "name": "rule"}, append_report=True
+    )
+    bundler_instance.add_ref({"type": "ipv4-addr", "id": "ipv4-addr--1", "value": "1.1.1.1"})
+    return bundler_instance
+
+
+def test_write_bundle_matches_to_json(filled_bundler, tmp_path):
+    path = tmp_path / "bundle.json"
+    filled_bundler.write_bundle(path)
+    assert path.read_text() == filled_bundler.to_json()
+
+
+def test_write_empty_bundle(tmp_path):
+    path = tmp_path / "bundle.json"
+    with BundleWriter(path, "bundle--1"):
+        pass
+    assert json.loads(path.read_text()) == {
+        "type": "bundle",
+        "id": "bundle--1",
+        "objects": [],
+    }
+
+
+def test_bundle_dict_matches_to_json(filled_bundler):
+    assert filled_bundler.bundle_dict == json.loads(filled_bundler.to_json())
+
+
+@pytest.mark.parametrize("compression", [None, "gzip", "zstd"])
+@pytest.mark.parametrize("compact", [True, False])
+def test_write_json(filled_bundler, tmp_path, compression, compact):
+    if compression == "zstd":
+        zstandard = pytest.importorskip("zstandard")
+    path = tmp_path / "bundle.json"
+    filled_bundler.write_bundle(path, compact=compact, compression=compression)
+    data = path.read_bytes()
+    if compression == "gzip":
+        data = gzip.decompress(data)
+    elif compression == "zstd":
+        data = zstandard.ZstdDecompressor().stream_reader(data).read()
+    assert json.loads(data) == filled_bundler.bundle_dict
+    assert (b"\n" not in data) == compact
+
+
+def test_write_ndjson(filled_bundler, tmp_path):
+    path = tmp_path / "bundle.ndjson"
+    filled_bundler.write_bundle(path, format="ndjson")
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == filled_bundler.bundle_dict["objects"]
+
+
+def test_failed_write_leaves_no_file(tmp_path):
+    path = tmp_path / "bundle.json"
+    with pytest.raises(RuntimeError):
+        with BundleWriter(path, "bundle--1") as writer:
+            writer.write({"id": "x"})
+            raise RuntimeError()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stream_to(bundler_instance, tmp_path):
+    path = tmp_path / "bundle.json"
+    defaults = [obj["id"] for obj in bundler_instance.bundle.objects]
+    bundler_instance.stream_to(BundleWriter(path, bundler_instance.bundle.id).open())
+    bundler_instance.add_ref(
+        {"type": "indicator", "id": "indicator--1", "name": "rule"}, append_report=True
+    )
+    bundler_instance.add_ref({"type": "ipv4-addr", "id": "ipv4-addr--1", "value": "1.1.1.1"})
+    bundler_instance.add_ref({"type": "ipv4-addr", "id": "ipv4-addr--1", "value": "1.1.1.1"})
+
+    # only indicators and the report are kept in memory
+    assert [obj["type"] for obj in bundler_instance.bundle.objects] == [
+        "report",
+        "indicator",
+    ]
+    assert bundler_instance.all_objects["ipv4-addr--1"] is None
+    assert "ipv4-addr" not in bundler_instance.objects_by_type
+    bundler_instance.close_stream()
+
+    objects = json.loads(path.read_text())["objects"]
+    report_id = bundler_instance.report.id
+    assert [obj["id"] for obj in objects] == [
+        *[obj_id for obj_id in defaults if obj_id != report_id],
+        "indicator--1",
+        "ipv4-addr--1",
+        report_id,
+    ]
+    assert objects[-1]["object_refs"] == ["indicator--1"]
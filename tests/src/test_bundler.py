@@ -1,13 +1,15 @@
+import threading
+import time
 import pytest
 import uuid
 from unittest.mock import MagicMock, patch
+import requests
 
 import stix2
 from txt2detection.ai_extractor.utils import AIDetectionFailure
 from txt2detection.bundler import Bundler
 from txt2detection.models import DetectionContainer, SigmaRuleDetection, Level
 from datetime import datetime, timezone
-from stix2 import Relationship
 
 from txt2detection.utils import remove_rule_specific_tags
 
@@ -134,6 +136,19 @@ def test_add_rule_indicator_basic(
         ], "rule_md5_hash should not be present when description is None"
 
 
+def test_add_text_observables(bundler_instance):
+    bundler_instance.add_text_observables(
+        [("ipv4-addr", "1.2.3.4"), ("file.hashes.MD5", "not a hash")]
+    )
+    assert bundler_instance.data.text_observables[0] == dict(
+        type="ipv4-addr", value="1.2.3.4"
+    )
+    assert "error" in bundler_instance.data.text_observables[1]
+    ipv4 = bundler_instance.objects_by_type["ipv4-addr"][0]
+    assert ipv4["value"] == "1.2.3.4"
+    assert ipv4["id"] in bundler_instance.report.object_refs
+
+
 def test_generate_report_id_deterministic():
     created = datetime(2023, 1, 1, tzinfo=timezone.utc).isoformat()
     id1 = Bundler.generate_report_id("identity--1234", created, "test")
@@ -151,8 +166,9 @@ def test_bundle_dict_and_json(bundler_instance):
     assert "objects" in dict_data
 
 
-@patch("txt2detection.bundler.requests.get")
-def test_get_objects_pagination(mock_get, bundler_instance):
+@patch("txt2detection.bundler.http_client.get_session")
+def test_get_objects_pagination(mock_get_session, bundler_instance):
+    mock_get = mock_get_session.return_value.get
     # Simulate paginated API
     mock_get.side_effect = [
         MagicMock(
@@ -173,6 +189,47 @@ def test_get_objects_pagination(mock_get, bundler_instance):
     assert result == [{"id": "x"}]
 
 
+@pytest.mark.parametrize("workers", ["4", "1"])
+@patch("txt2detection.bundler.http_client.get_session")
+def test_get_objects_pagination__concurrent(
+    mock_get_session, bundler_instance, monkeypatch, workers
+):
+    monkeypatch.setenv("ENRICHMENT_PAGE_WORKERS", workers)
+    total = 2500
+
+    def get(endpoint, params, headers):
+        page, page_size = params["page"], params["page_size"]
+        if page == 2:
+            time.sleep(0.05)  # finishes after page 3 when fetched concurrently
+        ids = range((page - 1) * page_size, min(page * page_size, total))
+        return MagicMock(
+            status_code=200,
+            json=lambda: {
+                "objects": [{"id": i} for i in ids],
+                "page_results_count": len(ids),
+                "page_size": page_size,
+                "total_results_count": total,
+            },
+        )
+
+    mock_get_session.return_value.get.side_effect = get
+    result = bundler_instance._get_objects("http://example.com", headers={})
+    assert [obj["id"] for obj in result] == list(range(total))
+    assert sorted(
+        c.kwargs["params"]["page"]
+        for c in mock_get_session.return_value.get.call_args_list
+    ) == [1, 2, 3]
+
+
+@patch("txt2detection.bundler.http_client.get_session")
+def test_get_objects_raises_on_error(mock_get_session, bundler_instance):
+    resp = mock_get_session.return_value.get.return_value
+    resp.status_code = 503
+    resp.raise_for_status.side_effect = requests.HTTPError("503 Server Error")
+    with pytest.raises(requests.HTTPError):
+        bundler_instance._get_objects("http://example.com", headers={})
+
+
 def test_add_ref_deduplication(bundler_instance):
     sdo = {"id": "indicator--1234", "type": "indicator"}
     bundler_instance.add_ref(sdo)
@@ -198,11 +255,9 @@ def test_add_relation_creates_relationship(bundler_instance: Bundler):
     }
 
     bundler_instance.add_relation(indicator, target)
-    relationships = [
-        o for o in bundler_instance.bundle.objects if isinstance(o, Relationship)
-    ]
+    relationships = bundler_instance.objects_by_type["relationship"]
     assert any(
-        (r.source_ref == indicator["id"] and r.target_ref == target["id"])
+        (r["source_ref"] == indicator["id"] and r["target_ref"] == target["id"])
         for r in relationships
     )
 
@@ -299,6 +354,103 @@ def test_bundle_detections__creates_log_source(dummy_detection, bundler_instance
     ]
 
 
+def make_attack_object(attack_id, type="attack-pattern"):
+    return {
+        "type": type,
+        "id": f"{type}--{uuid.uuid5(uuid.NAMESPACE_URL, attack_id)}",
+        "name": attack_id,
+        "external_references": [
+            {"source_name": "mitre-attack", "external_id": attack_id}
+        ],
+    }
+
+
+def test_get_attack_objects__resolves_each_id_once(bundler_instance, monkeypatch):
+    monkeypatch.setenv("CTIBUTLER_BASE_URL", "http://ctibutler.example/api")
+    with patch.object(
+        Bundler,
+        "_get_objects",
+        return_value=[make_attack_object("T1190"), make_attack_object("T1547")],
+    ) as mock_get_objects:
+        retval = bundler_instance.get_attack_objects(["T1190", "T1547", "T1000"])
+        assert [r["name"] for r in retval] == ["T1190", "T1547"]
+        mock_get_objects.assert_called_once()
+        assert mock_get_objects.call_args[0][0].endswith(
+            "?attack_id=T1190,T1547,T1000"
+        )
+
+        mock_get_objects.reset_mock()
+        retval = bundler_instance.get_attack_objects(["t1547", "T1000"])
+        assert [r["name"] for r in retval] == ["T1547"]
+        mock_get_objects.assert_not_called()
+
+
+@patch("txt2detection.bundler.observables.find_stix_observables", return_value=[])
+@patch.object(Bundler, "get_attack_objects", return_value=[])
+@patch.object(Bundler, "get_cve_objects", return_value=[])
+def test_add_rule_indicator__does_not_share_external_references(
+    mock_cve, mock_attack, mock_observables, dummy_detection, bundler_instance
+):
+    bundler_instance.external_refs.append(
+        dict(source_name="report", external_id="shared")
+    )
+    external_refs = list(bundler_instance.external_refs)
+    other_detection = dummy_detection.model_copy(
+        update=dict(id=uuid.UUID("b6d0c1e3-54c7-4d3f-a8e6-8b1f5d5a1a11"))
+    )
+    bundler_instance.add_rule_indicator(dummy_detection)
+    bundler_instance.add_rule_indicator(other_detection)
+
+    indicators = bundler_instance.objects_by_type["indicator"]
+    assert bundler_instance.external_refs == external_refs
+    for indicator in indicators:
+        refs = indicator["external_references"]
+        assert refs[0] == dict(source_name="report", external_id="shared")
+        assert [ref["source_name"] for ref in refs].count("rule_md5_hash") == 1
+
+
+def test_bundle_detections__batches_enrichment(dummy_detection, bundler_instance):
+    other_detection = dummy_detection.model_copy(
+        update=dict(
+            id="b6d0c1e3-54c7-4d3f-a8e6-8b1f5d5a1a11",
+            tags=["attack.t1190", "attack.t1566", "cve.2024-1234"],
+        )
+    )
+    container = DetectionContainer(
+        success=True, detections=[dummy_detection, other_detection]
+    )
+    with (
+        patch.object(
+            Bundler, "get_attack_objects", autospec=True, return_value=[]
+        ) as mock_attack,
+        patch.object(Bundler, "get_cve_objects", autospec=True, return_value=[]) as mock_cve,
+        patch.object(Bundler, "add_rule_indicator") as mock_add_rule_indicator,
+    ):
+        bundler_instance.bundle_detections(container)
+        mock_attack.assert_called_once_with(
+            bundler_instance, ["TA0002", "T1190", "TA0001", "T1159", "T1025", "T1566"]
+        )
+        mock_cve.assert_called_once_with(bundler_instance, ["CVE-2024-1234"])
+        assert mock_add_rule_indicator.call_count == 2
+
+
+def test_prefetch_enrichment__resolves_services_concurrently(
+    dummy_detection, bundler_instance
+):
+    dummy_detection.tags.append("cve.2024-1234")
+    both_started = threading.Barrier(2, timeout=5)
+
+    def fetch(ids):
+        both_started.wait()  # raises BrokenBarrierError if run one after the other
+        return []
+
+    with (
+        patch.object(Bundler, "_fetch_attack_objects", side_effect=fetch),
+        patch.object(Bundler, "_fetch_cve_objects", side_effect=fetch),
+    ):
+        bundler_instance.prefetch_enrichment([dummy_detection])
+
+
 def test_get_attack_objects(bundler_instance):
     retval = bundler_instance.get_attack_objects(["T1190", "T1547"])
     assert {r["id"] for r in retval} == {
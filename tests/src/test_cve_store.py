@@ -0,0 +1,101 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from txt2detection import cve_store
+from txt2detection.bundler import Bundler
+from txt2detection.cve_store import CVEStore
+
+
+def make_vulnerability(cve_id, description="vulnerable"):
+    return {
+        "type": "vulnerability",
+        "spec_version": "2.1",
+        "id": f"vulnerability--{cve_id.lower()}",
+        "name": cve_id,
+        "description": description,
+        "external_references": [{"source_name": "cve", "external_id": cve_id}],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CVEStore(tmp_path / "cves.sqlite")
+    store.load(
+        [
+            make_vulnerability("CVE-2024-1234"),
+            make_vulnerability("CVE-2025-1234"),
+            {"type": "software", "id": "software--1", "name": "CVE-2023-0001"},
+        ]
+    )
+    return store
+
+
+def test_load_only_vulnerabilities(store):
+    assert store.count() == 2
+    assert store.load([make_vulnerability("CVE-2024-1234", "updated")]) == 1
+    assert store.count() == 2
+    assert store.get_objects(["CVE-2024-1234"])[0]["description"] == "updated"
+
+
+def test_get_objects(store):
+    assert [obj["name"] for obj in store.get_objects(
+        ["cve-2025-1234", "CVE-2000-0001", "CVE-2024-1234", "CVE-2025-1234"]
+    )] == ["CVE-2025-1234", "CVE-2024-1234"]
+    assert store.get_objects([]) == []
+
+
+def test_get_objects_in_batches(store):
+    store.load(make_vulnerability(f"CVE-2020-{i:05}") for i in range(1200))
+    ids = [f"CVE-2020-{i:05}" for i in range(1200)]
+    assert [obj["name"] for obj in store.get_objects(ids)] == ids
+
+
+def test_connection_per_thread(store):
+    connections = [store.connection]
+    thread = threading.Thread(target=lambda: connections.append(store.connection))
+    thread.start()
+    thread.join()
+    assert connections[0] is not connections[1]
+
+
+@pytest.mark.parametrize("as_bundle", [True, False])
+def test_load_file(tmp_path, as_bundle):
+    objects = [make_vulnerability("CVE-2024-1234"), make_vulnerability("CVE-2024-5678")]
+    path = tmp_path / "dump.json"
+    if as_bundle:
+        path.write_text(json.dumps({"type": "bundle", "objects": objects}))
+    else:
+        path.write_text("\n".join(map(json.dumps, objects)))
+    assert CVEStore(tmp_path / "cves.sqlite").load_file(path) == 2
+
+
+def test_get_store(store, monkeypatch):
+    monkeypatch.delenv("CVE_DATABASE", raising=False)
+    assert cve_store.get_store() is None
+    monkeypatch.setenv("CVE_DATABASE", str(store.path.parent / "missing.sqlite"))
+    with pytest.raises(FileNotFoundError):
+        cve_store.get_store()
+    monkeypatch.setenv("CVE_DATABASE", str(store.path))
+    assert cve_store.get_store() is cve_store.get_store()
+
+
+def test_bundler_uses_local_store(store, monkeypatch, bundler_instance):
+    monkeypatch.setenv("CVE_DATABASE", str(store.path))
+    monkeypatch.delenv("VULMATCH_BASE_URL", raising=False)
+    with patch.object(Bundler, "_get_objects") as mock_get_objects:
+        objects = bundler_instance.get_cve_objects(["CVE-2024-1234", "CVE-2000-0001"])
+        mock_get_objects.assert_not_called()
+    assert [obj["name"] for obj in objects] == ["CVE-2024-1234"]
+
+
+def test_bundler_uses_empty_local_store(tmp_path, monkeypatch, bundler_instance):
+    store = CVEStore(tmp_path / "cves.sqlite")
+    assert store.count() == 0
+    monkeypatch.setenv("CVE_DATABASE", str(store.path))
+    monkeypatch.delenv("VULMATCH_BASE_URL", raising=False)
+    with patch.object(Bundler, "_get_objects") as mock_get_objects:
+        assert bundler_instance.get_cve_objects(["CVE-2024-1234"]) == []
+        mock_get_objects.assert_not_called()
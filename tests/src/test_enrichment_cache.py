@@ -0,0 +1,112 @@
+from unittest.mock import patch
+
+import pytest
+
+from txt2detection import enrichment_cache
+from txt2detection.bundler import Bundler
+from txt2detection.enrichment_cache import EnrichmentCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return EnrichmentCache(tmp_path / "enrichment.sqlite")
+
+
+@pytest.fixture
+def enabled_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("TXT2DETECTION_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("ENRICHMENT_CACHE", "true")
+    monkeypatch.setenv("CTIBUTLER_BASE_URL", "http://ctibutler.example/api")
+    monkeypatch.setenv("VULMATCH_BASE_URL", "http://vulmatch.example/api")
+    monkeypatch.delenv("ATTACK_ENTERPRISE_BUNDLE", raising=False)
+    monkeypatch.delenv("CVE_DATABASE", raising=False)
+    yield enrichment_cache.get_cache()
+    enrichment_cache._cache = None
+
+
+def test_get_and_set(cache):
+    cache.set_many("ns", {"T1190": [{"id": "a"}], "T0000": []})
+    assert cache.get_many("ns", ["T1190", "T0000", "T1547"]) == {
+        "T1190": [{"id": "a"}],
+        "T0000": [],
+    }
+    assert cache.get_many("other", ["T1190"]) == {}
+    assert cache.stats() == dict(hits=2, misses=2, hit_rate=0.5)
+
+
+def test_entries_expire(cache):
+    cache.set_many("ns", {"T1190": []})
+    with patch("txt2detection.enrichment_cache.time.time", return_value=4e10):
+        assert cache.get_many("ns", ["T1190"]) == {}
+
+
+def test_least_recently_used_are_evicted(tmp_path):
+    cache = EnrichmentCache(tmp_path / "enrichment.sqlite", max_entries=2)
+    with patch("txt2detection.enrichment_cache.time.time") as mock_time:
+        mock_time.return_value = 1e10
+        cache.set_many("ns", {"a": [], "b": []})
+        mock_time.return_value = 1e10 + 1
+        cache.get_many("ns", ["a"])
+        mock_time.return_value = 1e10 + 2
+        cache.set_many("ns", {"c": []})
+        assert set(cache.get_many("ns", ["a", "b", "c"])) == {"a", "c"}
+
+
+def test_get_cache_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("ENRICHMENT_CACHE", raising=False)
+    assert enrichment_cache.get_cache() is None
+
+
+def test_bundler_attack_objects_are_cached_per_version(enabled_cache):
+    attack_pattern = {
+        "id": "attack-pattern--1",
+        "external_references": [{"external_id": "T1190"}],
+    }
+    with (
+        patch.object(Bundler, "get_attack_version", return_value="17.1"),
+        patch.object(
+            Bundler, "_get_objects", return_value=[attack_pattern]
+        ) as mock_get_objects,
+    ):
+        bundler = Bundler("one", None, "red", "description", [])
+        assert bundler.get_attack_objects(["T1190", "T0000"]) == [attack_pattern]
+        mock_get_objects.assert_called_once()
+
+        mock_get_objects.reset_mock()
+        bundler = Bundler("two", None, "red", "description", [])
+        assert bundler.get_attack_objects(["T1190", "T0000"]) == [attack_pattern]
+        mock_get_objects.assert_not_called()
+
+    with (
+        patch.object(Bundler, "get_attack_version", return_value="18.0"),
+        patch.object(Bundler, "_get_objects", return_value=[]) as mock_get_objects,
+    ):
+        bundler = Bundler("three", None, "red", "description", [])
+        assert bundler.get_attack_objects(["T1190"]) == []
+        mock_get_objects.assert_called_once()
+
+
+def test_bundler_attack_version_failure_is_looked_up_once(enabled_cache):
+    with (
+        patch.object(
+            Bundler, "get_attack_version", side_effect=ConnectionError
+        ) as mock_get_attack_version,
+        patch.object(Bundler, "_get_objects", return_value=[]) as mock_get_objects,
+    ):
+        bundler = Bundler("one", None, "red", "description", [])
+        bundler.get_attack_objects(["T1190"])
+        bundler.get_attack_objects(["T1547"])
+        mock_get_attack_version.assert_called_once()
+        assert mock_get_objects.call_count == 2
+
+
+def test_bundler_cve_objects_are_cached(enabled_cache):
+    vulnerability = {"id": "vulnerability--1", "name": "CVE-2024-1234"}
+    with patch.object(
+        Bundler, "_get_objects", return_value=[vulnerability]
+    ) as mock_get_objects:
+        for name in ["one", "two"]:
+            bundler = Bundler(name, None, "red", "description", [])
+            assert bundler.get_cve_objects(["CVE-2024-1234"]) == [vulnerability]
+        mock_get_objects.assert_called_once()
+    assert enabled_cache.stats()["hits"] == 1
@@ -0,0 +1,108 @@
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from txt2detection import http_client
+from txt2detection.http_client import EnrichmentSession
+
+
+@pytest.fixture(autouse=True)
+def reset_session():
+    http_client.reset_session()
+    yield
+    http_client.reset_session()
+
+
+def test_session_defaults(monkeypatch):
+    for name in [
+        "ENRICHMENT_HTTP_TIMEOUT",
+        "ENRICHMENT_HTTP_RETRIES",
+        "ENRICHMENT_HTTP_BACKOFF",
+        "ENRICHMENT_MAX_CONNECTIONS_PER_HOST",
+    ]:
+        monkeypatch.delenv(name, raising=False)
+    session = EnrichmentSession()
+    adapter = session.get_adapter("https://ctibutler.example/")
+    assert session.timeout == 30
+    assert session.max_per_host == 8
+    assert adapter.max_retries.total == 5
+    assert adapter.max_retries.backoff_factor == 0.5
+    assert set(adapter.max_retries.status_forcelist) == {429, 500, 502, 503, 504}
+    assert adapter._pool_maxsize == 8
+
+
+def test_session_env_config(monkeypatch):
+    monkeypatch.setenv("ENRICHMENT_HTTP_TIMEOUT", "2.5")
+    monkeypatch.setenv("ENRICHMENT_HTTP_RETRIES", "0")
+    monkeypatch.setenv("ENRICHMENT_MAX_CONNECTIONS_PER_HOST", "3")
+    session = EnrichmentSession()
+    assert session.timeout == 2.5
+    assert session.max_per_host == 3
+    assert session.get_adapter("http://x/").max_retries.total == 0
+
+
+@pytest.mark.parametrize("timeout", [0, 0.0, -1])
+def test_explicit_zero_timeout_waits_forever(monkeypatch, timeout):
+    monkeypatch.setenv("ENRICHMENT_HTTP_TIMEOUT", "2.5")
+    assert EnrichmentSession(timeout=timeout).timeout is None
+    monkeypatch.setenv("ENRICHMENT_HTTP_TIMEOUT", str(timeout))
+    assert EnrichmentSession().timeout is None
+
+
+@pytest.mark.parametrize("max_per_host", [0, -1])
+def test_max_per_host_must_be_positive(monkeypatch, max_per_host):
+    with pytest.raises(ValueError):
+        EnrichmentSession(max_per_host=max_per_host)
+    monkeypatch.setenv("ENRICHMENT_MAX_CONNECTIONS_PER_HOST", str(max_per_host))
+    with pytest.raises(ValueError):
+        EnrichmentSession()
+
+
+def test_request_sets_default_timeout():
+    session = EnrichmentSession(timeout=7)
+    with patch("requests.Session.request") as mock_request:
+        session.get("https://ctibutler.example/")
+        assert mock_request.call_args.kwargs["timeout"] == 7
+        session.get("https://ctibutler.example/", timeout=1)
+        assert mock_request.call_args.kwargs["timeout"] == 1
+
+
+def test_requests_per_host_are_limited():
+    session = EnrichmentSession(max_per_host=2)
+    in_flight = dict(current=0, peak=0)
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def fake_request(self, method, url, *args, **kwargs):
+        with lock:
+            in_flight["current"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        release.wait(1)
+        with lock:
+            in_flight["current"] -= 1
+
+    with patch("requests.Session.request", fake_request):
+        threads = [
+            threading.Thread(target=session.get, args=("https://ctibutler.example/",))
+            for _ in range(6)
+        ]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert in_flight["peak"] <= 2
+    assert session.host_limit("https://ctibutler.example/a") is session.host_limit(
+        "https://ctibutler.example/b"
+    )
+    assert session.host_limit("https://ctibutler.example/") is not session.host_limit(
+        "https://vulmatch.example/"
+    )
+
+
+def test_get_session_is_shared_and_recreated_after_fork():
+    session = http_client.get_session()
+    assert http_client.get_session() is session
+    with patch("txt2detection.http_client.os.getpid", return_value=-1):
+        assert http_client.get_session() is not session
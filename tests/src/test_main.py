@@ -2,6 +2,7 @@ import json
 import os
 from pathlib import Path
 import sys
+import zipfile
 from unittest.mock import MagicMock, patch
 from pydantic import ValidationError
 import pytest
@@ -12,9 +13,14 @@ from txt2detection.__main__ import (
     parse_created,
     parse_ref,
     parse_label,
+    parse_license,
     parse_args,
     main,
+    find_sigma_files,
+    run_sigma_dir,
+    convert_sigma_rule,
 )
+from txt2detection.cve_store import CVEStore
 
 
 @pytest.mark.parametrize(
@@ -105,6 +111,39 @@ def test_parse_label_invalid_format(input_str):
         parse_label(input_str)
 
 
+@pytest.mark.parametrize(
+    "input_str, expected",
+    [
+        ("MIT", "MIT"),
+        ("mit", "MIT"),
+        ("apache-2.0", "Apache-2.0"),
+        ("DRL-1.1", "DRL-1.1"),
+    ],
+)
+def test_parse_license_valid(input_str, expected):
+    assert parse_license(input_str) == expected
+
+
+@pytest.mark.parametrize("input_str", ["not-a-license", "", "MIT-but-not-really"])
+def test_parse_license_invalid(input_str):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_license(input_str)
+
+
+def test_parse_args_loads_licenses_only_when_passed(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["prog", "sigma", "--name", "test"])
+    with patch("txt2detection.utils.valid_licenses") as mock_valid_licenses:
+        args = parse_args()
+        mock_valid_licenses.assert_not_called()
+    assert args.license is None
+
+    monkeypatch.setattr(
+        sys, "argv", ["prog", "sigma", "--name", "test", "--license", "mit"]
+    )
+    args = parse_args()
+    assert args.license == "MIT"
+
+
 @patch("txt2detection.__main__.parse_model")
 def test_parse_args_file_mode_with_minimal(parse_model, monkeypatch):
     # We patch sys.argv to simulate CLI arguments
@@ -153,6 +192,48 @@ def test_parse_args_check_credentials(monkeypatch):
         parse_args()
 
 
+@pytest.mark.parametrize(
+    "statuses,exit_code",
+    [
+        ({"schema": "refreshed"}, 0),
+        ({"schema": "refreshed", "extension": "failed"}, 1),
+    ],
+)
+def test_parse_args_refresh_cache(monkeypatch, statuses, exit_code):
+    monkeypatch.setattr(sys, "argv", ["prog", "refresh-cache"])
+    with (
+        patch("txt2detection.resources.refresh_all", return_value=statuses) as mock_refresh,
+        pytest.raises(SystemExit) as e,
+    ):
+        parse_args()
+    mock_refresh.assert_called_once_with()
+    assert e.value.code == exit_code
+
+
+def test_parse_args_load_cves(monkeypatch, tmp_path, capsys):
+    dump = tmp_path / "cves.json"
+    dump.write_text(
+        json.dumps(
+            [
+                {
+                    "type": "vulnerability",
+                    "id": "vulnerability--1",
+                    "name": "CVE-2024-1234",
+                }
+            ]
+        )
+    )
+    database = tmp_path / "cves.sqlite"
+    monkeypatch.setattr(
+        sys, "argv", ["prog", "load-cves", "--database", str(database), str(dump)]
+    )
+    with pytest.raises(SystemExit) as e:
+        parse_args()
+    assert e.value.code == 0
+    assert "1 vulnerabilities in" in capsys.readouterr().out
+    assert CVEStore(database).get_objects(["CVE-2024-1234"])[0]["id"] == "vulnerability--1"
+
+
 @pytest.fixture
 def args(tmp_path):
     """Fake Args object."""
@@ -210,6 +291,9 @@ def test_main_happy_path(
 
     called_kwargs = mock_run.call_args.kwargs
     assert called_kwargs["identity"] == args.use_identity
+    assert called_kwargs["stream_output"] == dict(
+        bundle_format="json", compact=False, compression=None
+    )
 
     out_dir = Path(f"./output/{fake_bundler.bundle.id}")
     assert (out_dir / "bundle.json").exists()
@@ -246,3 +330,220 @@ def test_main_validationerror_exit(mock_run, mock_setlog, args, tmp_path, monkey
     with pytest.raises(SystemExit), patch("logging.error") as mock_error:
         main(args)
         mock_error.assert_any_call("Validate sigma file failed: validation failed")
+
+
+@pytest.fixture
+def sigma_dir(tmp_path):
+    rule = Path("tests/files/sigma-rule-no-tags.yml").read_text()
+    (tmp_path / "rules/sub").mkdir(parents=True)
+    (tmp_path / "rules/one.yml").write_text(rule)
+    (tmp_path / "rules/sub/two.yaml").write_text(
+        rule.replace("1667a172-ed4c-463c-9969-efd92195319a", "2667a172-ed4c-463c-9969-efd92195319a")
+    )
+    (tmp_path / "rules/sub/bad.yml").write_text("- not a rule")
+    (tmp_path / "rules/notes.txt").write_text("not a rule")
+    return tmp_path
+
+
+def sigma_dir_args(monkeypatch, *extra):
+    monkeypatch.setattr(
+        sys, "argv", ["prog", "sigma-dir", "--sigma_dir", "rules", "--workers", "1", *extra]
+    )
+    return parse_args()
+
+
+def test_find_sigma_files(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    assert find_sigma_files(["rules"]) == [
+        Path("rules/one.yml"),
+        Path("rules/sub/bad.yml"),
+        Path("rules/sub/two.yaml"),
+    ]
+    assert find_sigma_files(["rules/**/*.yaml", "rules/one.yml", "rules/one.yml"]) == [
+        Path("rules/sub/two.yaml"),
+        Path("rules/one.yml"),
+    ]
+    assert find_sigma_files(["missing/*.yml"]) == []
+
+
+def test_run_sigma_dir_bundle_per_rule(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    args = sigma_dir_args(monkeypatch, "--level", "high")
+    results = run_sigma_dir(args)
+    assert [r["status"] for r in results] == ["ok", "failed", "ok"]
+    assert results[1]["error"].startswith("ValueError: bad sigma input file")
+
+    report = json.loads(Path("output/sigma-dir-report.json").read_text())
+    assert report == results
+    for result, rule_id in zip(
+        [results[0], results[2]],
+        ["1667a172-ed4c-463c-9969-efd92195319a", "2667a172-ed4c-463c-9969-efd92195319a"],
+    ):
+        assert result["report_id"] == rule_id
+        bundle = json.loads(Path(result["output"]).read_text())
+        indicator = [o for o in bundle["objects"] if o["type"] == "indicator"][0]
+        assert indicator["id"] == "indicator--" + rule_id
+        assert "level: high" in indicator["pattern"]
+        assert (Path(result["output"]).parent / f"rules/rule--{rule_id}.yml").exists()
+
+
+def test_run_sigma_dir_combined(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    args = sigma_dir_args(monkeypatch, "--combined", "--compact")
+    results = run_sigma_dir(args)
+    assert [r["status"] for r in results] == ["ok", "failed", "ok"]
+    assert results[0]["output"] == results[2]["output"]
+
+    bundle = json.loads(Path(results[0]["output"]).read_text())
+    ids = [o["id"] for o in bundle["objects"]]
+    assert len(ids) == len(set(ids)), "shared objects must only be written once"
+    assert {o["id"] for o in bundle["objects"] if o["type"] == "indicator"} == {
+        "indicator--1667a172-ed4c-463c-9969-efd92195319a",
+        "indicator--2667a172-ed4c-463c-9969-efd92195319a",
+    }
+    assert len(list(Path(results[0]["output"]).parent.glob("rules/rule--*.yml"))) == 2
+    report = json.loads(Path("output/sigma-dir-report.json").read_text())
+    assert "objects" not in report[0]
+
+
+@pytest.mark.parametrize("combined", [[], ["--combined"]])
+def test_run_sigma_dir_duplicate_rule_ids(sigma_dir, monkeypatch, combined):
+    monkeypatch.chdir(sigma_dir)
+    (sigma_dir / "rules/sub/copy.yml").write_text(
+        (sigma_dir / "rules/one.yml").read_text()
+    )
+    args = sigma_dir_args(monkeypatch, *combined)
+    args.workers = 2
+    results = run_sigma_dir(args)
+    assert [r["path"] for r in results] == [
+        "rules/one.yml",
+        "rules/sub/bad.yml",
+        "rules/sub/copy.yml",
+        "rules/sub/two.yaml",
+    ]
+    assert [r["status"] for r in results] == ["ok", "failed", "failed", "ok"]
+    assert results[2]["error"] == (
+        "ValueError: rule id `1667a172-ed4c-463c-9969-efd92195319a` is also used by `rules/one.yml`"
+    )
+    assert Path(results[0]["output"]).exists()
+
+
+def test_run_sigma_dir_process_pool(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    args = sigma_dir_args(monkeypatch, "--combined")
+    args.workers = 2
+    pooled = run_sigma_dir(args)
+    args.workers = 1
+    assert pooled == run_sigma_dir(args)
+
+
+@patch("txt2detection.__main__.setLogFile")
+def test_main_sigma_dir_exit_code(mock_setlog, sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    args = sigma_dir_args(monkeypatch)
+    with pytest.raises(SystemExit) as e:
+        main(args)
+    assert e.value.code == 19
+
+    args.sigma_dir = ["rules/one.yml"]
+    with pytest.raises(SystemExit) as e:
+        main(args)
+    assert e.value.code == 0
+
+
+def test_run_sigma_dir_incremental(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    args = sigma_dir_args(monkeypatch, "--incremental")
+    first = run_sigma_dir(args)
+    assert [r["status"] for r in first] == ["ok", "failed", "ok"]
+
+    second = run_sigma_dir(args)
+    assert [r["status"] for r in second] == ["unchanged", "failed", "unchanged"]
+    assert [r.get("output") for r in second] == [r.get("output") for r in first]
+
+    two = Path("rules/sub/two.yaml")
+    two.write_text(two.read_text().replace("2667a172", "3667a172"))
+    Path("rules/one.yml").unlink()
+    with patch(
+        "txt2detection.__main__.convert_sigma_rule",
+        wraps=convert_sigma_rule,
+    ) as convert:
+        third = run_sigma_dir(args)
+    assert [c.args[0] for c in convert.call_args_list] == ["rules/sub/two.yaml"]
+    assert [r["status"] for r in third] == ["failed", "ok"]
+    assert third[1]["report_id"] == "3667a172-ed4c-463c-9969-efd92195319a"
+    # outputs of removed and renamed rules are deleted
+    assert not Path(first[0]["output"]).exists()
+    assert not Path(first[2]["output"]).exists()
+    assert Path(third[1]["output"]).exists()
+
+    changed_options = sigma_dir_args(monkeypatch, "--incremental", "--level", "high")
+    assert [r["status"] for r in run_sigma_dir(changed_options)] == ["failed", "ok"]
+
+
+def test_parse_args_sigma_dir_incremental_not_combined(monkeypatch):
+    with pytest.raises(SystemExit) as e:
+        sigma_dir_args(monkeypatch, "--incremental", "--combined")
+    assert e.value.code == 2
+
+
+def test_run_sigma_dir_reports_schema_errors(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    rule = Path("rules/one.yml")
+    rule.write_text(
+        rule.read_text().replace("title: Okta Policy Modified or Deleted", "title: " + "x" * 300)
+    )
+    result = run_sigma_dir(sigma_dir_args(monkeypatch))[0]
+    assert result["status"] == "failed"
+    assert result["error"].startswith("ValidationError: $.title: ")
+    assert result["schema_errors"] == []
+
+
+def test_run_sigma_dir_collections_and_archives(sigma_dir, monkeypatch):
+    monkeypatch.chdir(sigma_dir)
+    one = Path("rules/one.yml").read_text()
+    with zipfile.ZipFile("rules/archive.zip", "w") as archive:
+        archive.writestr("windows/one.yml", one.replace("1667a172", "4667a172"))
+    Path("rules/one.yml").write_text(
+        one + "\n---\naction: repeat\nid: 5667a172-ed4c-463c-9969-efd92195319a\n---\n: [\n"
+    )
+    results = run_sigma_dir(sigma_dir_args(monkeypatch))
+    assert [(r["path"], r["status"]) for r in results] == [
+        ("rules/archive.zip/windows/one.yml", "ok"),
+        ("rules/one.yml", "ok"),
+        ("rules/one.yml#2", "ok"),
+        ("rules/one.yml#3", "failed"),
+        ("rules/sub/bad.yml", "failed"),
+        ("rules/sub/two.yaml", "ok"),
+    ]
+    assert [r.get("report_id", "")[:8] for r in results] == [
+        "4667a172", "1667a172", "5667a172", "", "", "2667a172"
+    ]
+
+
+def test_parse_args_sigma_file_collection(monkeypatch, tmp_path):
+    rule = Path("tests/files/sigma-rule-no-tags.yml").read_text()
+    single = tmp_path / "single.yml"
+    single.write_text("action: global\nlevel: high\n---\n" + rule.replace("level: low\n", ""))
+    monkeypatch.setattr(sys, "argv", ["prog", "sigma", "--name", "test", "--sigma_file", str(single)])
+    args = parse_args()
+    assert args.sigma_file["level"] == "high"
+    assert args.sigma_file["title"] == "Okta Policy Modified or Deleted"
+
+    multiple = tmp_path / "multiple.yml"
+    multiple.write_text(rule + "\n---\n" + rule)
+    monkeypatch.setattr(sys, "argv", ["prog", "sigma", "--name", "test", "--sigma_file", str(multiple)])
+    with pytest.raises(SystemExit) as e:
+        parse_args()
+    assert e.value.code == 2
+
+
+def test_parse_args_sigma_file_broken_second_document(monkeypatch, tmp_path, capsys):
+    rule = Path("tests/files/sigma-rule-no-tags.yml").read_text()
+    broken = tmp_path / "broken.yml"
+    broken.write_text(rule + "\n---\ntitle: [unclosed\n")
+    monkeypatch.setattr(sys, "argv", ["prog", "sigma", "--name", "test", "--sigma_file", str(broken)])
+    with pytest.raises(SystemExit) as e:
+        parse_args()
+    assert e.value.code == 2
+    assert f"cannot read `{broken}`" in capsys.readouterr().err
@@ -1,3 +1,8 @@
+import asyncio
+import json
+from pathlib import Path
+import threading
+import time
 import uuid
 from unittest.mock import MagicMock, patch
 
@@ -6,8 +11,11 @@ import pytest
 
 from txt2detection.__main__ import (
     run_txt2detection,
+    write_output,
 )
-from txt2detection.models import SigmaRuleDetection
+from txt2detection.models import DetectionContainer, SigmaRuleDetection
+
+NO_TAGS_RULE = Path("tests/files/sigma-rule-no-tags.yml").read_text()
 
 @pytest.mark.parametrize(
     'create_navigator_layer',
@@ -80,3 +88,200 @@ def test_run_txt2detection_sigma_branch(mock_get_sigma_detections, monkeypatch,
             mock_create_attack_navigator.assert_called_once_with()
         else:
             mock_create_attack_navigator.assert_not_called()
+
+
+def test_run_txt2detection_overlaps_attack_version_with_ai(monkeypatch):
+    version_requested = threading.Event()
+    ai_provider = MagicMock()
+
+    def get_detections(text):
+        # only returns if the version lookup started while the LLM was running
+        assert version_requested.wait(5)
+        return DetectionContainer(success=True, detections=[])
+
+    def get_attack_version():
+        version_requested.set()
+        return "17.1"
+
+    ai_provider.get_detections.side_effect = get_detections
+    with (
+        patch('txt2detection.__main__.validate_token_count'),
+        patch('txt2detection.bundler.Bundler.get_attack_version', side_effect=get_attack_version) as mock_get_attack_version,
+        patch('txt2detection.bundler.Bundler.create_attack_navigator') as mock_create_attack_navigator,
+    ):
+        bundler = run_txt2detection("name", None, "red", "my text", [], uuid.uuid4(), ai_provider, create_attack_navigator_layer=True)
+        mock_create_attack_navigator.assert_called_once_with()
+        mock_get_attack_version.assert_called_once_with()
+    assert bundler.attack_version == "17.1"
+
+
+def test_attack_version_is_looked_up_once_by_concurrent_readers(bundler_instance):
+    looking_up = threading.Event()
+
+    def get_attack_version():
+        looking_up.set()
+        time.sleep(0.1)
+        return "17.1"
+
+    with patch('txt2detection.bundler.Bundler.get_attack_version', side_effect=get_attack_version) as mock_get_attack_version:
+        thread = threading.Thread(target=getattr, args=(bundler_instance, "attack_version"))
+        thread.start()
+        looking_up.wait(5)
+        assert bundler_instance.attack_version == "17.1"
+        thread.join()
+    mock_get_attack_version.assert_called_once_with()
+
+
+def test_run_txt2detection_failed_ai_stops_text_scan():
+    scanning = threading.Event()
+    stopped = []
+
+    def get_detections(text):
+        assert scanning.wait(5)
+        raise RuntimeError("llm failed")
+
+    def find_text_observables(text, stop):
+        scanning.set()
+        stopped.append(stop.wait(5))
+        return []
+
+    ai_provider = MagicMock()
+    ai_provider.get_detections.side_effect = get_detections
+
+    with (
+        patch('txt2detection.__main__.validate_token_count'),
+        patch('txt2detection.observables.find_text_observables', side_effect=find_text_observables),
+        pytest.raises(RuntimeError, match="llm failed"),
+    ):
+        run_txt2detection("name", None, "red", "my text", [], uuid.uuid4(), ai_provider, extract_text_observables=True)
+    assert stopped == [True]
+
+
+def test_run_txt2detection_attack_version_prefetch_failure():
+    ai_provider = MagicMock()
+    ai_provider.get_detections.return_value = DetectionContainer(success=True, detections=[])
+    with (
+        patch('txt2detection.__main__.validate_token_count'),
+        patch('txt2detection.bundler.Bundler.get_attack_version', side_effect=[ConnectionError, "17.1"]),
+    ):
+        bundler = run_txt2detection("name", None, "red", "my text", [], uuid.uuid4(), ai_provider, create_attack_navigator_layer=True)
+    assert bundler.mitre_version == "17.1"
+
+
+@pytest.mark.parametrize('extract_text_observables', [True, False])
+def test_run_txt2detection_extract_text_observables(extract_text_observables):
+    ai_provider = MagicMock()
+    ai_provider.get_detections.return_value = DetectionContainer(success=True, detections=[])
+    input_text = "beacons to 1.2.3.4 and evil.example.com"
+    with patch('txt2detection.__main__.validate_token_count'):
+        bundler = run_txt2detection("name", None, "red", input_text, [], uuid.uuid4(), ai_provider, extract_text_observables=extract_text_observables)
+    if extract_text_observables:
+        assert bundler.data.text_observables == [
+            dict(type="ipv4-addr", value="1.2.3.4"),
+            dict(type="domain-name", value="evil.example.com"),
+        ]
+        assert [ref.split("--")[0] for ref in bundler.report.object_refs] == ["ipv4-addr", "domain-name"]
+    else:
+        assert bundler.data.text_observables is None
+
+
+@pytest.mark.parametrize('extract_text_observables', [True, False])
+def test_data_json_without_text_observables(tmp_path, monkeypatch, extract_text_observables):
+    monkeypatch.chdir(tmp_path)
+    ai_provider = MagicMock()
+    ai_provider.get_detections.return_value = DetectionContainer(success=True, detections=[])
+    with patch('txt2detection.__main__.validate_token_count'):
+        bundler = run_txt2detection("name", None, "red", "no observables", [], uuid.uuid4(), ai_provider, extract_text_observables=extract_text_observables)
+    data = json.loads((write_output(bundler).parent / "data.json").read_text())
+    expected = {
+        "detections": {"success": True, "fail_reason": None, "detections": []},
+        "navigator_layer": None,
+        "observables": None,
+        "cves": {},
+        "attacks": {},
+    }
+    if extract_text_observables:
+        expected.update(text_observables=[])
+    assert data == expected
+
+
+def test_run_txt2detection_inside_running_event_loop():
+    ai_provider = MagicMock()
+    ai_provider.get_detections.return_value = DetectionContainer(success=True, detections=[])
+
+    async def caller():
+        return run_txt2detection("name", None, "red", "my text", [], uuid.uuid4(), ai_provider)
+
+    with patch('txt2detection.__main__.validate_token_count'):
+        bundler = asyncio.run(caller())
+    assert bundler.report.name == "name"
+    ai_provider.get_detections.assert_called_once_with("my text")
+
+
+def test_run_txt2detection_streams_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    report_id = uuid.uuid4()
+    previous = Path("output") / f"bundle--{report_id}"
+    (previous / "rules").mkdir(parents=True)
+    (previous / "bundle.json").write_text("previous")
+    bundler = run_txt2detection(
+        None,
+        None,
+        None,
+        "",
+        [],
+        report_id,
+        None,
+        sigma_file=NO_TAGS_RULE,
+        stream_output=dict(bundle_format="ndjson", compact=True, compression=None),
+    )
+    path = previous / "bundle.ndjson"
+    assert bundler.stream_path == path
+    # only indicators and the report are kept in memory
+    assert {obj["type"] for obj in bundler.bundle.objects} == {"report", "indicator"}
+    assert None in bundler.all_objects.values()
+    with pytest.raises(RuntimeError):
+        bundler.to_json()
+    with pytest.raises(RuntimeError):
+        bundler.bundle_dict
+    objects = [json.loads(line) for line in path.read_text().splitlines()]
+    assert objects[-1]["id"] == bundler.report.id
+    assert {obj["id"] for obj in objects} == set(bundler.all_objects)
+
+    assert write_output(bundler) == path
+    assert sorted(p.name for p in path.parent.iterdir()) == [
+        "bundle.ndjson",
+        "data.json",
+        "rules",
+    ]
+
+
+@pytest.mark.parametrize("has_previous_output", [True, False])
+def test_run_txt2detection_failed_stream_keeps_previous_output(
+    tmp_path, monkeypatch, has_previous_output
+):
+    monkeypatch.chdir(tmp_path)
+    report_id = uuid.uuid4()
+    previous = Path("output") / f"bundle--{report_id}"
+    if has_previous_output:
+        previous.mkdir(parents=True)
+        (previous / "bundle.json").write_text("previous")
+    with patch(
+        "txt2detection.bundler.Bundler.bundle_detections", side_effect=RuntimeError
+    ), pytest.raises(RuntimeError):
+        run_txt2detection(
+            None,
+            None,
+            None,
+            "",
+            [],
+            report_id,
+            None,
+            sigma_file=NO_TAGS_RULE,
+            stream_output=dict(),
+        )
+    if has_previous_output:
+        assert [p.name for p in previous.iterdir()] == ["bundle.json"]
+        assert (previous / "bundle.json").read_text() == "previous"
+    else:
+        assert not previous.exists()
@@ -0,0 +1,57 @@
+import json
+
+from txt2detection.manifest import MANIFEST_VERSION, Manifest, fingerprint, rule_md5
+
+
+def test_fingerprint_depends_on_options():
+    assert fingerprint(dict(a=1, b=None)) == fingerprint(dict(b=None, a=1))
+    assert fingerprint(dict(a=1)) != fingerprint(dict(a=2))
+
+
+def test_rule_md5():
+    rule = dict(title="rule", detection=dict(condition="selection"))
+    assert rule_md5(rule) == rule_md5(dict(detection=dict(condition="selection"), title="rule"))
+    assert rule_md5(rule) != rule_md5(dict(rule, title="another rule"))
+
+
+def test_manifest_roundtrip(tmp_path):
+    md5 = rule_md5(dict(title="rule"))
+    output = tmp_path / "output/bundle--1/bundle.json"
+    output.parent.mkdir(parents=True)
+    output.write_text("{}")
+
+    manifest = Manifest.load(tmp_path / "manifest.json", "abc")
+    assert manifest.files == {}
+    manifest.record("rule.yml", md5, dict(report_id="1", output=str(output)))
+    manifest.save()
+
+    loaded = Manifest.load(tmp_path / "manifest.json", "abc")
+    assert loaded.is_unchanged("rule.yml", md5)
+    assert not loaded.is_unchanged("rule.yml", "another hash")
+    assert not loaded.is_unchanged("another.yml", md5)
+    output.unlink()
+    assert not loaded.is_unchanged("rule.yml", md5), "missing output"
+
+
+def test_manifest_load_discards_other_options(tmp_path):
+    path = tmp_path / "manifest.json"
+    files = {"rule.yml": dict(md5="x", report_id="1", output="bundle.json")}
+    path.write_text(
+        json.dumps(dict(version=MANIFEST_VERSION, fingerprint="abc", files=files))
+    )
+    assert Manifest.load(path, "abc").files == files
+    assert Manifest.load(path, "def").files == {}
+    path.write_text("not json")
+    assert Manifest.load(path, "abc").files == {}
+
+
+def test_manifest_remove_missing(tmp_path):
+    manifest = Manifest(tmp_path / "manifest.json", "abc")
+    manifest.files = {
+        "a.yml": dict(md5="a", report_id="1", output="a"),
+        "b.yml": dict(md5="b", report_id="2", output="b"),
+    }
+    assert manifest.remove_missing(["a.yml"]) == [
+        dict(md5="b", report_id="2", output="b")
+    ]
+    assert list(manifest.files) == ["a.yml"]
@@ -1,7 +1,11 @@
+from unittest.mock import patch
+import jsonschema
 import pytest
 import uuid
 from datetime import date as dt_date
 
+from txt2detection import models
+
 from txt2detection.models import (
     TLP_LEVEL,
     SigmaTag,
@@ -192,3 +196,58 @@ def test_sigma_detection_id_tracks_renamed():
     assert len(det.related) == 1
     assert det.related[0].type == "renamed"
     assert det.related[0].id == id1
+
+
+# -----------------------
+# BaseDetection.validate_rule_with_json_schema
+# -----------------------
+@pytest.fixture
+def schema_detection():
+    return BaseDetection(
+        title="Test",
+        description="Desc",
+        detection={},
+        logsource={},
+        falsepositives=[],
+        tags=[],
+        level=Level.low,
+    )
+
+
+def test_validate_rule_with_json_schema_reuses_validator(schema_detection):
+    schema = schema_detection.sigma_json_schema
+    rule = dict(
+        title="Test",
+        logsource=dict(product="windows"),
+        detection=dict(selection=dict(a=1), condition="selection"),
+    )
+    validator = models.get_schema_validator(schema)
+    with patch.object(type(validator), "check_schema") as check_schema:
+        schema_detection.validate_rule_with_json_schema(rule)
+        schema_detection.validate_rule_with_json_schema(rule)
+        assert models.get_schema_validator(schema) is validator
+        check_schema.assert_not_called()
+
+        refreshed = dict(schema)
+        assert models.get_schema_validator(refreshed) is not validator
+        check_schema.assert_called_once_with(refreshed)
+
+
+def test_validate_rule_with_json_schema_raises_best_match(schema_detection):
+    rule = dict(title=1, level="not-a-level", detection=dict(condition="selection"))
+    with pytest.raises(jsonschema.ValidationError) as expected:
+        jsonschema.validate(rule, schema_detection.sigma_json_schema)
+    with pytest.raises(jsonschema.ValidationError) as e:
+        schema_detection.validate_rule_with_json_schema(rule)
+    assert e.value.message == expected.value.message
+    assert len(e.value.__notes__) == len(schema_detection.schema_errors(rule)) - 1
+    paths = [e.value.json_path] + [note.split(": ")[0] for note in e.value.__notes__]
+    assert "$.level" in paths
+
+
+def test_schema_errors_collects_all_errors(schema_detection):
+    assert schema_detection.schema_errors(
+        dict(title="t", logsource={}, detection=dict(condition="selection"))
+    ) == []
+    errors = schema_detection.schema_errors(dict(title=1, level="not-a-level"))
+    assert {e.json_path for e in errors} >= {"$", "$.title", "$.level"}
@@ -1,3 +1,7 @@
+import io
+import threading
+from unittest.mock import patch
+
 import pytest
 from txt2detection import observables
 
@@ -58,6 +62,129 @@ def test_find_stix_observables_simple():
     } == set(matches)
 
 
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("192.168.1.1", ["ipv4-addr"]),
+        ("user@example.com", ["email-addr"]),
+        ("http://example.com/path", ["url"]),
+        ("EXAMPLE.COM", ["domain-name"]),
+        ("d41d8cd98f00b204e9800998ecf8427e", ["file.hashes.MD5"]),
+        ("HKEY_LOCAL_MACHINE\\Software", ["windows-registry-key"]),
+        ("\\cmd.exe", []),
+        ("powershell -enc", []),
+        ("1.2.3.4 and example.com", []),
+    ],
+)
+def test_match_value(value, expected):
+    assert observables.match_value(value) == expected
+
+
+def test_find_stix_observables_key_and_value_matches():
+    detection = {
+        "sel": {"ip": "10.0.0.1", "DestinationHostname": ["example.com", "cmd"]},
+        "condition": "sel",
+    }
+    assert observables.find_stix_observables(detection) == [
+        ("ipv4-addr", "10.0.0.1"),
+        ("domain-name", "example.com"),
+    ]
+
+
+def test_find_stix_observables_deduplicates_in_order():
+    detection = {
+        "a": ["example.com", "1.1.1.1"],
+        "b": {"ip": "1.1.1.1", "domain": ["example.com", "example.org"]},
+    }
+    assert observables.find_stix_observables(detection) == [
+        ("domain-name", "example.com"),
+        ("ipv4-addr", "1.1.1.1"),
+        ("domain-name", "example.org"),
+    ]
+
+
+def test_iter_stix_observables_paths():
+    detection = {
+        "sel": {"ip": "10.0.0.1", "list": ["cmd", "example.com"]},
+        "other": "example.com",
+    }
+    assert list(observables.iter_stix_observables(detection)) == [
+        ("ipv4-addr", "10.0.0.1", ("sel", "ip")),
+        ("domain-name", "example.com", ("sel", "list", 1)),
+        ("domain-name", "example.com", ("other",)),
+    ]
+
+
+def test_iter_stix_observables_visits_each_value_once():
+    detection = {"root": {}}
+    node = detection["root"]
+    for _ in range(50):
+        node["ip"] = "10.0.0.1"
+        node["next"] = node = {}
+    with patch.object(
+        observables, "match_value", wraps=observables.match_value
+    ) as mock_match_value:
+        found = list(observables.iter_stix_observables(detection))
+    assert len(found) == 50
+    mock_match_value.assert_called_once_with("10.0.0.1")
+
+
+REPORT_TEXT = """The actor (evil@bad.com) staged payloads on http://x.com/a?b=1 and
+beaconed to 1.2.3.4, 10.0.0.300 and example.org every minute. The dropper
+rundll32.exe d41d8cd98f00b204e9800998ecf8427e persisted in
+HKEY_LOCAL_MACHINE\\Software\\Run from 00:1A:2B:3C:4D:5E. Again 1.2.3.4.
+"""
+
+
+def test_find_text_observables():
+    assert observables.find_text_observables(REPORT_TEXT) == [
+        ("email-addr", "evil@bad.com"),
+        ("url", "http://x.com/a?b=1"),
+        ("ipv4-addr", "1.2.3.4"),
+        ("domain-name", "example.org"),
+        ("file.hashes.MD5", "d41d8cd98f00b204e9800998ecf8427e"),
+        ("windows-registry-key", "HKEY_LOCAL_MACHINE\\Software\\Run"),
+        ("mac-addr", "00:1A:2B:3C:4D:5E"),
+    ]
+
+
+def test_find_text_observables__hyphenated_mac():
+    text = "seen from 00-1A-2B-3C-4D-5E on a well-known host"
+    assert observables.find_text_observables(text) == [
+        ("mac-addr", "00-1A-2B-3C-4D-5E")
+    ]
+    assert list(
+        observables.find_stix_observables({"mac": "00-1A-2B-3C-4D-5E"})
+    ) == [("mac-addr", "00-1A-2B-3C-4D-5E")]
+
+
+@pytest.mark.parametrize("chunk_size", [10, 41, 64, 100, 1000])
+def test_find_text_observables__chunks(chunk_size):
+    text = REPORT_TEXT * 20
+    assert observables.find_text_observables(
+        io.StringIO(text), chunk_size=chunk_size, overlap=40
+    ) == observables.find_text_observables(text)
+
+
+def test_iter_text_observables__stop():
+    stop = threading.Event()
+    stream = io.StringIO("1.2.3.4 " + "x " * 10_000 + "5.6.7.8")
+    found = observables.iter_text_observables(
+        stream, chunk_size=100, overlap=10, stop=stop
+    )
+    assert next(found) == ("ipv4-addr", "1.2.3.4")
+    stop.set()
+    assert list(found) == []
+    assert stream.tell() <= 300
+
+
+def test_iter_text_observables__is_lazy():
+    stream = io.StringIO("1.2.3.4 " + "x " * 10_000 + "5.6.7.8")
+    found = observables.iter_text_observables(stream, chunk_size=100, overlap=10)
+    assert next(found) == ("ipv4-addr", "1.2.3.4")
+    assert stream.tell() <= 200
+
+
 @pytest.mark.parametrize(
     "observable_type,value,expected_type,expected_value",
     [
@@ -94,3 +221,24 @@ def test_to_stix_object(observable_type, value, expected_type, expected_value):
         else:
             # For other types, value attribute should match input value
             assert stix_obj.value == value
+
+
+def test_to_stix_object__memoized():
+    observables.to_stix_object.cache_clear()
+    first = observables.to_stix_object("ipv4-addr", "10.1.2.3")
+    assert observables.to_stix_object("ipv4-addr", "10.1.2.3") is first
+    assert observables.to_stix_object("domain-name", "10.1.2.3") is not first
+    stats = observables.cache_stats()["to_stix_object"]
+    assert stats == dict(hits=1, misses=2, hit_rate=1 / 3, size=2)
+
+
+def test_filter_out__memoized():
+    observables.filter_out.cache_clear()
+    with patch.object(
+        observables.validators, "ipv4", wraps=observables.validators.ipv4
+    ) as mock_ipv4:
+        assert observables.filter_out("ipv4-addr", "10.1.2.3") is True
+        assert observables.filter_out("ipv4-addr", "10.1.2.3") is True
+        assert observables.filter_out("ipv4-addr", "10.1.2.300") is False
+    assert mock_ipv4.call_count == 2
+    assert observables.cache_stats()["filter_out"]["hits"] == 1
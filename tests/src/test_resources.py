@@ -0,0 +1,209 @@
+import json
+from datetime import UTC, datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from txt2detection import resources
+from txt2detection.resources import CachedResource
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("TXT2DETECTION_CACHE_DIR", str(tmp_path))
+    monkeypatch.delenv("TXT2DETECTION_OFFLINE", raising=False)
+    return tmp_path / f"v{resources.CACHE_VERSION}"
+
+
+@pytest.fixture
+def resource():
+    resource = CachedResource(
+        "test-resource",
+        "https://example.com/resource.json",
+        snapshot="sigma-detection-rule-schema.json",
+    )
+    yield resource
+    CachedResource.registry.pop("test-resource", None)
+
+
+def make_response(status_code=200, body=None, headers=None):
+    return MagicMock(
+        status_code=status_code, json=lambda: body, headers=headers or {}
+    )
+
+
+def test_load_falls_back_to_snapshot_when_offline(cache_dir, resource, monkeypatch):
+    monkeypatch.setenv("TXT2DETECTION_OFFLINE", "1")
+    with patch("txt2detection.resources.requests.get") as mock_get:
+        value = resource.load()
+        mock_get.assert_not_called()
+    assert value["title"].startswith("Sigma rule specification")
+
+
+def test_load_falls_back_to_snapshot_on_network_error(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get", side_effect=ConnectionError()
+    ) as mock_get:
+        value = resource.load()
+        mock_get.assert_called_once()
+    assert "properties" in value
+
+
+def test_load_is_lazy_and_memoized(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"a": 1}, headers={"ETag": '"v1"'}),
+    ) as mock_get:
+        mock_get.assert_not_called()
+        assert resource.load() == {"a": 1}
+        assert resource.load() == {"a": 1}
+        mock_get.assert_called_once()
+    assert json.loads((cache_dir / "test-resource.json").read_text()) == {"a": 1}
+    assert json.loads((cache_dir / "test-resource.meta.json").read_text())["etag"] == '"v1"'
+
+
+def test_fresh_cache_is_used_without_request(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"a": 1}),
+    ):
+        resource.load()
+    resource.clear()
+    with patch("txt2detection.resources.requests.get") as mock_get:
+        assert resource.load() == {"a": 1}
+        mock_get.assert_not_called()
+
+
+def test_stale_cache_is_revalidated(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(
+            body={"a": 1},
+            headers={"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"},
+        ),
+    ):
+        resource.load()
+    meta = json.loads(resource.meta_path.read_text())
+    meta["fetched_at"] = (datetime.now(UTC) - timedelta(days=30)).isoformat()
+    resource.meta_path.write_text(json.dumps(meta))
+    resource.clear()
+
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(status_code=304),
+    ) as mock_get:
+        assert resource.load() == {"a": 1}
+        headers = mock_get.call_args.kwargs["headers"]
+        assert headers["If-None-Match"] == '"v1"'
+        assert headers["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+    meta = json.loads(resource.meta_path.read_text())
+    assert datetime.now(UTC) - datetime.fromisoformat(meta["fetched_at"]) < timedelta(
+        minutes=1
+    )
+
+
+def test_stale_cache_is_used_when_upstream_unreachable(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"a": 1}),
+    ):
+        resource.load()
+    meta = json.loads(resource.meta_path.read_text())
+    meta["fetched_at"] = "2000-01-01T00:00:00+00:00"
+    resource.meta_path.write_text(json.dumps(meta))
+    resource.clear()
+    with patch(
+        "txt2detection.resources.requests.get", side_effect=ConnectionError()
+    ):
+        assert resource.load() == {"a": 1}
+
+
+def cache_from_other_url(resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"a": 1}, headers={"ETag": '"v1"'}),
+    ):
+        resource.load()
+    resource.url = "https://example.com/moved.json"
+    resource.clear()
+
+
+def test_cache_from_other_url_is_not_revalidated(cache_dir, resource):
+    cache_from_other_url(resource)
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"b": 2}),
+    ) as mock_get:
+        assert resource.load() == {"b": 2}
+        assert mock_get.call_args.kwargs["headers"] == {}
+    meta = json.loads(resource.meta_path.read_text())
+    assert meta["url"] == "https://example.com/moved.json"
+
+
+def test_cache_from_other_url_is_not_used_offline(cache_dir, resource, monkeypatch):
+    cache_from_other_url(resource)
+    monkeypatch.setenv("TXT2DETECTION_OFFLINE", "1")
+    assert resource.load()["title"].startswith("Sigma rule specification")
+
+
+def test_cache_from_other_url_is_not_used_when_upstream_unreachable(
+    cache_dir, resource
+):
+    cache_from_other_url(resource)
+    with patch(
+        "txt2detection.resources.requests.get", side_effect=ConnectionError()
+    ):
+        assert "properties" in resource.load()
+
+
+def test_sigma_json_schema_class_attribute():
+    from txt2detection.models import BaseDetection
+
+    assert isinstance(BaseDetection.__dict__["sigma_json_schema"], CachedResource)
+    with patch.object(resources.SIGMA_JSON_SCHEMA, "load", return_value={}) as mock_load:
+        assert BaseDetection.sigma_json_schema == {}
+        mock_load.assert_called_once()
+
+
+def test_refresh_all(cache_dir, resource):
+    with patch(
+        "txt2detection.resources.requests.get",
+        return_value=make_response(body={"a": 1}),
+    ):
+        statuses = resources.refresh_all()
+    assert statuses["test-resource"] == "refreshed"
+    assert resource.load() == {"a": 1}
+    for other in CachedResource.registry.values():
+        other.clear()
+
+    with patch(
+        "txt2detection.resources.requests.get", side_effect=ConnectionError()
+    ):
+        statuses = resources.refresh_all()
+    assert statuses["test-resource"] == "failed"
+
+
+@pytest.mark.parametrize(
+    "cached_resource,expected_id",
+    [
+        (
+            resources.SIGMA_EXTENSION_DEFINITION,
+            "extension-definition--c16c84c5-9cfd-50a2-970d-09c0ff2700f7",
+        ),
+        (
+            resources.DATA_SOURCE_EXTENSION_DEFINITION,
+            "extension-definition--afeeb724-bce2-575e-af3d-d705842ea84b",
+        ),
+    ],
+)
+def test_extension_definition_snapshots(cached_resource, expected_id):
+    assert cached_resource._read_snapshot()["id"] == expected_id
+
+
+def test_bundler_extension_definitions_are_lazy():
+    from txt2detection.bundler import Bundler
+
+    assert isinstance(Bundler.__dict__["sigma_extension_definition"], CachedResource)
+    assert isinstance(
+        Bundler.__dict__["data_source_extension_definition"], CachedResource
+    )
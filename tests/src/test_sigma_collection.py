@@ -0,0 +1,137 @@
+import io
+import tarfile
+import zipfile
+
+import pytest
+
+from txt2detection import sigma_collection
+
+
+COLLECTION = """
+action: global
+title: Suspicious process
+logsource:
+    product: windows
+detection:
+    condition: selection
+---
+logsource:
+    category: process_creation
+detection:
+    selection:
+        Image: a.exe
+---
+action: repeat
+detection:
+    selection:
+        Image: b.exe
+---
+action: reset
+---
+title: Unrelated
+logsource:
+    product: linux
+detection:
+    selection:
+        a: 1
+    condition: selection
+"""
+
+
+def test_iter_collection():
+    rules = list(sigma_collection.iter_collection(COLLECTION))
+    assert rules == [
+        dict(
+            title="Suspicious process",
+            logsource=dict(product="windows", category="process_creation"),
+            detection=dict(condition="selection", selection=dict(Image="a.exe")),
+        ),
+        dict(
+            title="Suspicious process",
+            logsource=dict(product="windows", category="process_creation"),
+            detection=dict(condition="selection", selection=dict(Image="b.exe")),
+        ),
+        dict(
+            title="Unrelated",
+            logsource=dict(product="linux"),
+            detection=dict(selection=dict(a=1), condition="selection"),
+        ),
+    ]
+
+
+def test_iter_collection_yields_independent_rules():
+    first, second = sigma_collection.iter_collection(
+        "title: a\ndetection: {condition: x}\n---\naction: repeat\ntitle: b\n"
+    )
+    first["detection"]["condition"] = "changed"
+    assert second == dict(title="b", detection=dict(condition="x"))
+
+
+@pytest.mark.parametrize(
+    "stream,message",
+    [
+        ("action: repeat\ntitle: a", "must follow a rule"),
+        ("action: merge\ntitle: a", "unsupported collection action `merge`"),
+        ("- a\n- b", "expected object/dict"),
+    ],
+)
+def test_iter_collection_invalid(stream, message):
+    with pytest.raises(ValueError, match=message):
+        list(sigma_collection.iter_collection(stream))
+
+
+def test_iter_collection_is_lazy():
+    rules = sigma_collection.iter_collection("title: a\n---\ntitle: b\n---\n: [")
+    assert next(rules) == dict(title="a")
+    assert next(rules) == dict(title="b")
+
+
+@pytest.fixture
+def archives(tmp_path):
+    files = {
+        "rules/a.yml": b"title: a\n",
+        "rules/collection.yaml": b"title: b\n---\ntitle: c\n",
+        "rules/readme.md": b"# not a rule",
+    }
+    with zipfile.ZipFile(tmp_path / "rules.zip", "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    with tarfile.open(tmp_path / "rules.tar.gz", "w:gz") as archive:
+        for name, content in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    (tmp_path / "rule.yml").write_bytes(files["rules/a.yml"])
+    return tmp_path
+
+
+@pytest.mark.parametrize("archive", ["rules.zip", "rules.tar.gz"])
+def test_iter_rules_archive(archives, archive):
+    path = archives / archive
+    assert list(sigma_collection.iter_rules(path)) == [
+        (f"{path.as_posix()}/rules/a.yml", dict(title="a")),
+        (f"{path.as_posix()}/rules/collection.yaml", dict(title="b")),
+        (f"{path.as_posix()}/rules/collection.yaml#2", dict(title="c")),
+    ]
+
+
+def test_iter_rules_file(archives):
+    path = archives / "rule.yml"
+    assert list(sigma_collection.iter_rules(path)) == [
+        (path.as_posix(), dict(title="a"))
+    ]
+
+
+@pytest.mark.parametrize(
+    "name,is_archive",
+    [("a.zip", True), ("a.tar.gz", True), ("a.TGZ", True), ("a.gz", False), ("a.yml", False)],
+)
+def test_is_archive(name, is_archive):
+    assert sigma_collection.is_archive(name) == is_archive
+
+
+def test_merge():
+    base = dict(a=dict(b=1, c=[1]), d=1)
+    merged = sigma_collection.merge(base, dict(a=dict(c=[2]), e=2))
+    assert merged == dict(a=dict(b=1, c=[2]), d=1, e=2)
+    assert base == dict(a=dict(b=1, c=[1]), d=1)
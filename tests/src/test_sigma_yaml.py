@@ -0,0 +1,49 @@
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+import yaml
+
+from txt2detection import sigma_yaml
+
+
+RULES = sorted(Path("tests/files").glob("*.yml"))
+
+
+@pytest.mark.parametrize("path", RULES, ids=lambda p: p.name)
+def test_load_and_dump_match_pure_python(path):
+    text = path.read_text()
+    rule = sigma_yaml.load(text)
+    assert rule == yaml.safe_load(text)
+    assert sigma_yaml.dump(rule, sort_keys=False, indent=4) == yaml.dump(
+        rule, sort_keys=False, indent=4
+    )
+
+
+@pytest.mark.parametrize(
+    "rule",
+    [
+        {"title": "é ü " * 40},
+        {"detection": {"selection": {"CommandLine|contains": "a\tb \n" * 40}}},
+        {"detection": {"": "empty key"}},
+        {"detection": {"multi\nline": 1}},
+        {"detection": {"k" * 150: 1}},
+    ],
+)
+def test_dump_falls_back_to_pure_python(rule):
+    assert sigma_yaml.dump(rule, sort_keys=False, indent=4) == yaml.dump(
+        rule, sort_keys=False, indent=4
+    )
+
+
+@pytest.mark.skipif(sigma_yaml.CDumper is None, reason="PyYAML built without libyaml")
+def test_dump_uses_libyaml(monkeypatch):
+    rule = {"title": "Rule", "detection": {"condition": "selection"}}
+    with patch("yaml.dump", wraps=yaml.dump) as dump:
+        sigma_yaml.dump(rule)
+    assert dump.call_args.kwargs["Dumper"] is sigma_yaml.CDumper
+
+    monkeypatch.setenv("TXT2DETECTION_PURE_YAML", "true")
+    with patch("yaml.dump", wraps=yaml.dump) as dump:
+        sigma_yaml.dump(rule)
+    assert "Dumper" not in dump.call_args.kwargs
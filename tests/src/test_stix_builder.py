@@ -0,0 +1,135 @@
+import copy
+from datetime import UTC, datetime
+import json
+from unittest.mock import patch
+
+import pytest
+from stix2 import Indicator, Relationship
+from stix2.serialization import serialize
+
+from txt2detection import stix_builder
+from txt2detection.bundler import Bundler
+
+
+INDICATOR = dict(
+    id="indicator--cd7ff0b1-fbf3-4c2d-ba70-5d127eb8b4be",
+    created_by_ref="identity--a4d70b75-6f4a-5d19-9137-da863edd33d7",
+    created=datetime(2025, 1, 1, tzinfo=UTC),
+    modified=datetime(2025, 1, 2, 3, 4, 5, 678000, tzinfo=UTC),
+    indicator_types=None,
+    name="Rule",
+    description="",
+    labels=[],
+    pattern_type="sigma",
+    pattern="title: Rule",
+    valid_from=datetime(2025, 1, 1, tzinfo=UTC),
+    object_marking_refs=["marking-definition--a4d70b75-6f4a-5d19-9137-da863edd33d7"],
+    external_references=[
+        dict(url="https://example.com", description="d", source_name="s"),
+        dict(source_name="rule_md5_hash", external_id="abc"),
+    ],
+    extensions={
+        "extension-definition--c16c84c5-9cfd-50a2-970d-09c0ff2700f7": {
+            "extension_type": "toplevel-property-extension"
+        }
+    },
+    x_sigma_type="base",
+    x_sigma_level="high",
+    x_sigma_license=None,
+)
+
+RELATIONSHIP = dict(
+    id="relationship--fe0a3715-6a21-5472-840f-39ea9c61ee83",
+    source_ref="indicator--cd7ff0b1-fbf3-4c2d-ba70-5d127eb8b4be",
+    target_ref="data-source--f078a18f-0f04-5fde-b6cd-a5af90b6346b",
+    relationship_type="related-to",
+    created_by_ref="identity--a4d70b75-6f4a-5d19-9137-da863edd33d7",
+    description="a related-to b",
+    created="2025-01-01T00:00:00Z",
+    modified="2025-01-01T00:00:00.123456Z",
+    object_marking_refs=["marking-definition--a4d70b75-6f4a-5d19-9137-da863edd33d7"],
+    external_references=[],
+)
+
+
+@pytest.mark.parametrize(
+    "cls,properties", [(Indicator, INDICATOR), (Relationship, RELATIONSHIP)]
+)
+def test_build_matches_stix2(cls, properties, monkeypatch):
+    monkeypatch.delenv("TXT2DETECTION_STRICT_STIX", raising=False)
+    obj = stix_builder.build(cls, **properties)
+    assert isinstance(obj, dict)
+    expected = json.loads(serialize(cls(allow_custom=True, **properties)))
+    assert json.loads(json.dumps(obj)) == expected
+    # same property order, custom properties aside
+    assert [k for k in obj if not k.startswith("x_")] == [
+        k for k in expected if not k.startswith("x_")
+    ]
+
+
+def test_build_copies_lists_and_dicts():
+    properties = copy.deepcopy(INDICATOR)
+    properties["x_sigma_falsepositives"] = ["unknown"]
+    obj = stix_builder.build(Indicator, **properties)
+    properties["object_marking_refs"].append("marking-definition--other")
+    properties["extensions"]["other"] = {}
+    properties["x_sigma_falsepositives"].append("more")
+    assert obj["object_marking_refs"] == INDICATOR["object_marking_refs"]
+    assert list(obj["extensions"]) == [
+        "extension-definition--c16c84c5-9cfd-50a2-970d-09c0ff2700f7"
+    ]
+    assert obj["x_sigma_falsepositives"] == ["unknown"]
+
+
+def test_bundler_objects_do_not_share_report_markings(bundler_instance):
+    indicator = dict(INDICATOR, object_marking_refs=bundler_instance.report.object_marking_refs)
+    obj = stix_builder.build(Indicator, **indicator)
+    markings = list(obj["object_marking_refs"])
+    bundler_instance.report.object_marking_refs.append("marking-definition--other")
+    assert obj["object_marking_refs"] == markings
+
+
+def test_build_strict(monkeypatch):
+    monkeypatch.setenv("TXT2DETECTION_STRICT_STIX", "true")
+    assert isinstance(stix_builder.build(Relationship, **RELATIONSHIP), Relationship)
+    with pytest.raises(Exception):
+        stix_builder.build(Relationship, **dict(RELATIONSHIP, source_ref="bad"))
+
+
+@pytest.mark.parametrize("strict", ["true", ""])
+def test_bundler_output_is_the_same_in_strict_mode(
+    strict, monkeypatch, bundler_instance
+):
+    monkeypatch.setenv("TXT2DETECTION_STRICT_STIX", strict)
+    indicator = dict(id="indicator--cd7ff0b1-fbf3-4c2d-ba70-5d127eb8b4be", name="Rule")
+    target = {
+        "id": "attack-pattern--1ecb2399-e8ba-4f6b-8ba7-5c27d49405cf",
+        "name": "Exploit Public-Facing Application",
+        "external_references": [{"external_id": "T1190", "source_name": "mitre-attack"}],
+    }
+    indicator["external_references"] = []
+    bundler_instance.add_relation(indicator, target)
+    [relationship] = [
+        obj
+        for obj in bundler_instance.bundle_dict["objects"]
+        if obj["type"] == "relationship"
+    ]
+    assert relationship == {
+        "type": "relationship",
+        "spec_version": "2.1",
+        "id": "relationship--d13bd9c9-395f-5754-88cf-16a52cf4e9e7",
+        "created_by_ref": "identity--a4d70b75-6f4a-5d19-9137-da863edd33d7",
+        "created": "2025-01-01T00:00:00.000Z",
+        "modified": "2025-01-01T00:00:00.000Z",
+        "relationship_type": "related-to",
+        "description": "Rule related-to T1190 (Exploit Public-Facing Application)",
+        "source_ref": "indicator--cd7ff0b1-fbf3-4c2d-ba70-5d127eb8b4be",
+        "target_ref": "attack-pattern--1ecb2399-e8ba-4f6b-8ba7-5c27d49405cf",
+        "external_references": [
+            {"source_name": "mitre-attack", "external_id": "T1190"}
+        ],
+        "object_marking_refs": [
+            "marking-definition--e828b379-4e03-4974-9ac4-e53a884c97c1",
+            "marking-definition--a4d70b75-6f4a-5d19-9137-da863edd33d7",
+        ],
+    }
@@ -1,8 +1,19 @@
 from datetime import datetime, date
+import os
+import subprocess
+import sys
 from unittest.mock import MagicMock, patch, CallableMixin
 
 import pytest
-from txt2detection.utils import parse_model, remove_rule_specific_tags, as_date, validate_token_count
+from txt2detection.ai_extractor import ModelError
+from txt2detection.utils import (
+    get_license_id,
+    parse_model,
+    remove_rule_specific_tags,
+    as_date,
+    validate_token_count,
+    valid_licenses,
+)
 
 
 def test_remove_rule_specific_tags():
@@ -29,3 +40,73 @@ def test_validate_token_count():
         with pytest.raises(Exception):
             validate_token_count(1000, "", provider)
         validate_token_count(2000, "", provider)
+
+
+def test_valid_licenses_uses_bundled_table(monkeypatch, tmp_path):
+    from txt2detection.resources import SPDX_LICENSES
+
+    monkeypatch.setenv("TXT2DETECTION_CACHE_DIR", str(tmp_path))
+    monkeypatch.setenv("TXT2DETECTION_OFFLINE", "1")
+    SPDX_LICENSES.clear()
+    try:
+        licenses = valid_licenses()
+    finally:
+        SPDX_LICENSES.clear()
+    assert licenses["MIT"] == "MIT License"
+    assert licenses["Apache-2.0"] == "Apache License 2.0"
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("MIT", "MIT"),
+        ("gpl-3.0-only", "GPL-3.0-only"),
+        ("unknown-license", None),
+    ],
+)
+def test_get_license_id(value, expected):
+    assert get_license_id(value) == expected
+
+
+def test_import_does_not_load_ai_providers():
+    code = (
+        "import sys, txt2detection.__main__;"
+        "loaded = [m for m in sys.modules if m.startswith(('llama_index', 'txt2detection.ai_extractor.base'))];"
+        "assert not loaded, loaded"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, env=dict(os.environ, TXT2DETECTION_OFFLINE="1"))
+
+
+def test_all_ai_extractors_lists_providers_without_importing():
+    from txt2detection.ai_extractor import ALL_AI_EXTRACTORS
+
+    with patch("txt2detection.ai_extractor.importlib") as mock_importlib:
+        assert "openai" in ALL_AI_EXTRACTORS
+        assert "not-a-provider" not in ALL_AI_EXTRACTORS
+        assert set(ALL_AI_EXTRACTORS) == {"openai", "anthropic", "gemini", "deepseek", "openrouter"}
+        mock_importlib.import_module.assert_not_called()
+
+
+def test_parse_model_imports_only_requested_provider():
+    with patch("txt2detection.ai_extractor.importlib") as mock_importlib, patch.dict(
+        "txt2detection.ai_extractor.base._ai_extractor_registry", clear=True
+    ):
+        with pytest.raises(KeyError):
+            parse_model("gemini")
+        mock_importlib.import_module.assert_called_once_with(
+            "txt2detection.ai_extractor.gemini"
+        )
+
+
+def test_parse_model_provider_not_installed():
+    with patch("txt2detection.ai_extractor.importlib") as mock_importlib, patch.dict(
+        "txt2detection.ai_extractor.base._ai_extractor_registry", clear=True
+    ):
+        mock_importlib.import_module.side_effect = ImportError
+        with pytest.raises(ModelError, match="not installed"):
+            parse_model("deepseek")
+
+
+def test_parse_model_invalid_provider():
+    with pytest.raises(NotImplementedError):
+        parse_model("not-a-provider:model")
@@ -13,7 +13,7 @@ from txt2detection.__main__ import main, parse_args
 if __name__ == '__main__':
     load_dotenv(override=True)
     args = parse_args()
-    if not os.getenv('CTIBUTLER_BASE_URL'):
-        logging.fatal("CTIBUTLER_BASE_URL env not set, exiting...")
+    if not os.getenv('CTIBUTLER_BASE_URL') and not os.getenv('ATTACK_ENTERPRISE_BUNDLE'):
+        logging.fatal("neither CTIBUTLER_BASE_URL nor ATTACK_ENTERPRISE_BUNDLE env set, exiting...")
         sys.exit(11)
     main(args)
@@ -1,2 +1,2 @@
-from .__main__ import run_txt2detection
+from .__main__ import arun_txt2detection, run_txt2detection
 from . import observables, bundler, models, utils
\ No newline at end of file
@@ -1,29 +1,50 @@
 import argparse
+import asyncio
 from datetime import UTC, datetime
 
+import collections
+import contextlib
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
-import io
+import glob
 import json
 import os
 from pathlib import Path
 import logging
 import re
 import sys
+import threading
+import typing
 import uuid
+import jsonschema
 from pydantic import ValidationError
 from stix2 import Identity
+from tqdm import tqdm
 import yaml
 
-from txt2detection import credential_checker
-from txt2detection.ai_extractor.base import BaseAIExtractor
+from txt2detection import (
+    attack_index,
+    bundle_writer,
+    credential_checker,
+    cve_store,
+    observables,
+    resources,
+    sigma_collection,
+    sigma_yaml,
+)
+from txt2detection.manifest import Manifest, fingerprint, rule_md5
 from txt2detection.models import (
     TAG_PATTERN,
+    UUID_NAMESPACE,
     DetectionContainer,
     Level,
     SigmaRuleDetection,
 )
 from txt2detection.utils import validate_token_count
 
+if typing.TYPE_CHECKING:
+    from txt2detection.ai_extractor.base import BaseAIExtractor
+
 
 def configureLogging():
     # Configure logging
@@ -58,7 +79,7 @@ from .bundler import Bundler
 import shutil
 
 
-from .utils import STATUSES, as_date, make_identity, valid_licenses, parse_model
+from .utils import STATUSES, as_date, get_license_id, make_identity, parse_model
 
 
 def parse_identity(str):
@@ -74,10 +95,14 @@ class Args:
     labels: list[str]
     created: datetime
     use_identity: Identity
-    ai_provider: BaseAIExtractor
+    ai_provider: "BaseAIExtractor"
     report_id: uuid.UUID
     external_refs: dict[str, str]
     reference_urls: list[str]
+    bundle_format: str
+    compact: bool
+    compression: str
+    extract_text_observables: bool
 
 
 def parse_created(value):
@@ -104,6 +129,15 @@ def validate_length(value: str):
         )
     return value
 
+def parse_license(value: str):
+    license_id = get_license_id(value)
+    if not license_id:
+        raise argparse.ArgumentTypeError(
+            f"`{value}` is not a valid SPDX license id, see https://spdx.org/licenses/"
+        )
+    return license_id
+
+
 def parse_label(label: str):
     if not TAG_PATTERN.match(label):
         raise argparse.ArgumentTypeError(
@@ -115,6 +149,24 @@ def parse_label(label: str):
     return label
 
 
+def read_sigma_file(value: str):
+    rules = sigma_collection.iter_rules(value)
+    with contextlib.closing(rules):
+        try:
+            _, rule = next(rules)
+            # a later rule is parsed too, to tell a collection from one rule
+            more = next(rules, None)
+        except StopIteration:
+            raise argparse.ArgumentTypeError(f"no sigma rule in `{value}`")
+        except (OSError, ValueError, yaml.YAMLError) as e:
+            raise argparse.ArgumentTypeError(f"cannot read `{value}`: {e}")
+    if more:
+        raise argparse.ArgumentTypeError(
+            f"`{value}` holds more than one rule, use the sigma-dir mode"
+        )
+    return rule
+
+
 def parse_args():
     parser = argparse.ArgumentParser(
         description="Convert text file to detection format."
@@ -125,10 +177,35 @@ def parse_args():
     file = mode.add_parser("file", help="process a file input using ai")
     text = mode.add_parser("text", help="process a text argument using ai")
     sigma = mode.add_parser("sigma", help="process a sigma file without ai")
+    sigma_dir = mode.add_parser(
+        "sigma-dir",
+        help="process every sigma file in a directory or glob without ai, in parallel",
+    )
     check_credentials = mode.add_parser(
         "check-credentials",
         help="show status of external services with respect to credentials",
     )
+    mode.add_parser(
+        "refresh-cache",
+        help="re-download cached schemas and extension definitions",
+    )
+    load_cves = mode.add_parser(
+        "load-cves",
+        help="load STIX vulnerabilities into the local CVE database used instead of Vulmatch",
+    )
+    load_cves.add_argument(
+        "--database",
+        default=os.getenv("CVE_DATABASE"),
+        required=not os.getenv("CVE_DATABASE"),
+        type=Path,
+        help="SQLite file to load into, defaults to the CVE_DATABASE env",
+    )
+    load_cves.add_argument(
+        "stix_files",
+        nargs="+",
+        type=Path,
+        help="STIX bundles, JSON lists of objects or files with one object per line",
+    )
 
     for mode_parser in [file, text, sigma]:
         mode_parser.add_argument(
@@ -139,6 +216,15 @@ def parse_args():
             required=True,
             help="Name of file, max 72 chars. Will be used in the STIX Report Object created.",
         )
+        mode_parser.add_argument(
+            "--ai_provider",
+            required=False,
+            type=parse_model,
+            help="(required): defines the `provider:model` to be used. Select one option.",
+            metavar="provider[:model]",
+        )
+
+    for mode_parser in [file, text, sigma, sigma_dir]:
         mode_parser.add_argument(
             "--tlp_level",
             choices=["clear", "green", "amber", "amber_strict", "red"],
@@ -161,13 +247,6 @@ def parse_args():
             type=parse_identity,
             help="Pass a full STIX 2.1 identity object (properly escaped). Validated by the STIX2 library. Default is SIEM Rules identity.",
         )
-        mode_parser.add_argument(
-            "--ai_provider",
-            required=False,
-            type=parse_model,
-            help="(required): defines the `provider:model` to be used. Select one option.",
-            metavar="provider[:model]",
-        )
         mode_parser.add_argument(
             "--external_refs",
             type=parse_ref,
@@ -190,7 +269,7 @@ def parse_args():
             help="Valid SPDX license for the rule",
             default=None,
             metavar="[LICENSE]",
-            choices=valid_licenses(),
+            type=parse_license,
         )
         mode_parser.add_argument(
             "--create_attack_navigator_layer",
@@ -198,6 +277,24 @@ def parse_args():
             action="store_true",
             default=False,
         )
+        mode_parser.add_argument(
+            "--bundle_format",
+            choices=bundle_writer.FORMATS,
+            default="json",
+            help="write the bundle as a STIX bundle (json, default) or one object per line (ndjson)",
+        )
+        mode_parser.add_argument(
+            "--compact",
+            help="write the bundle without indentation",
+            action="store_true",
+            default=False,
+        )
+        mode_parser.add_argument(
+            "--compression",
+            choices=["gzip", "zstd"],
+            default=None,
+            help="compress the bundle, zstd requires the zstandard package (txt2detection[zstd])",
+        )
 
     file.add_argument(
         "--input_file",
@@ -205,21 +302,54 @@ def parse_args():
         type=lambda x: Path(x).read_text(),
     )
     text.add_argument("--input_text", help="The text to be converted", type=validate_length)
+    for mode_parser in [file, text]:
+        mode_parser.add_argument(
+            "--extract_text_observables",
+            help="also add the observables found in the input text to the report",
+            action="store_true",
+            default=False,
+        )
     sigma.add_argument(
         "--sigma_file",
-        help="The sigma file to be converted. Must be .yml",
-        type=lambda x: Path(x).read_text(),
+        help="The sigma file to be converted. Must be .yml, a rule collection or a .zip/.tar.gz archive holding a single rule",
+        type=read_sigma_file,
     )
-    sigma.add_argument(
-        "--status",
-        help="If passed, will overwrite any existing `status` recorded in the rule",
-        choices=STATUSES,
+    sigma_dir.add_argument(
+        "--sigma_dir",
+        help="directory (searched recursively for .yml/.yaml files), sigma file or glob pattern, can be passed more than once",
+        required=True,
+        action="extend",
+        nargs="+",
     )
-    sigma.add_argument(
-        "--level",
-        help="If passed, will overwrite any existing `level` recorded in the rule",
-        choices=Level._member_names_,
+    sigma_dir.add_argument(
+        "--combined",
+        help="write all rules (and their reports) to one bundle instead of one bundle per rule",
+        action="store_true",
+        default=False,
     )
+    sigma_dir.add_argument(
+        "--incremental",
+        help="only convert the rules added or changed since the last run, see output/sigma-dir-manifest.json",
+        action="store_true",
+        default=False,
+    )
+    sigma_dir.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes, default is the number of CPUs",
+    )
+    for mode_parser in [sigma, sigma_dir]:
+        mode_parser.add_argument(
+            "--status",
+            help="If passed, will overwrite any existing `status` recorded in the rule",
+            choices=STATUSES,
+        )
+        mode_parser.add_argument(
+            "--level",
+            help="If passed, will overwrite any existing `level` recorded in the rule",
+            choices=Level._member_names_,
+        )
 
     args: Args = parser.parse_args()
     if args.mode == "check-credentials":
@@ -227,6 +357,24 @@ def parse_args():
         credential_checker.format_statuses(statuses)
         sys.exit(0)
 
+    if args.mode == "refresh-cache":
+        statuses = resources.refresh_all()
+        for name, status in statuses.items():
+            print(f"  {name:<45}: {status}")
+        sys.exit(0 if "failed" not in statuses.values() else 1)
+
+    if args.mode == "load-cves":
+        store = cve_store.CVEStore(args.database)
+        for path in args.stix_files:
+            print(f"  {str(path):<45}: {store.load_file(path)} vulnerabilities")
+        print(f"{store.count()} vulnerabilities in {args.database}")
+        sys.exit(0)
+
+    if args.mode == "sigma-dir":
+        if args.combined and args.incremental:
+            parser.error("--incremental cannot be used with --combined")
+        return args
+
     if args.mode != "sigma":
         assert args.ai_provider, "--ai_provider is required in file or txt mode"
 
@@ -249,10 +397,64 @@ def run_txt2detection(
     input_text: str,
     labels: list[str],
     report_id: str | uuid.UUID,
-    ai_provider: BaseAIExtractor,
+    ai_provider: "BaseAIExtractor",
+    create_attack_navigator_layer=False,
+    **kwargs,
+) -> Bundler:
+    """
+    Synchronous `arun_txt2detection`. Coroutines should await
+    `arun_txt2detection` instead, when called from a running event loop this
+    blocks the loop while it runs on a new loop in a worker thread.
+    """
+    coro = arun_txt2detection(
+        name,
+        identity,
+        tlp_level,
+        input_text,
+        labels,
+        report_id,
+        ai_provider,
+        create_attack_navigator_layer=create_attack_navigator_layer,
+        **kwargs,
+    )
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+
+async def _prefetch_attack_version(bundler: Bundler):
+    try:
+        await asyncio.to_thread(getattr, bundler, "attack_version")
+    except Exception as e:
+        # create_attack_navigator() looks it up again and reports the error
+        logging.debug(f"attack version prefetch failed: {e}")
+
+
+async def arun_txt2detection(
+    name,
+    identity,
+    tlp_level,
+    input_text: str,
+    labels: list[str],
+    report_id: str | uuid.UUID,
+    ai_provider: "BaseAIExtractor",
     create_attack_navigator_layer=False,
+    stream_output: dict = None,
     **kwargs,
 ) -> Bundler:
+    """
+    Same as `run_txt2detection`, the ATT&CK version needed by the navigator
+    layers is looked up while the detections are being generated and
+    blocking calls run in worker threads.
+
+    With `stream_output` (`bundle_format`, `compact` and `compression`), the
+    bundle is written to `output/<bundle id>/` as objects are added instead
+    of being kept in memory, see `Bundler.stream_to()`. The previous output
+    is only replaced once the bundle is complete.
+    """
     if not kwargs.get("sigma_file"):
         validate_token_count(
             int(os.getenv("INPUT_TOKEN_LIMIT", 0)), input_text, ai_provider
@@ -291,19 +493,61 @@ def run_txt2detection(
         )
         detections = DetectionContainer(success=True, detections=[])
         detections.detections.append(detection)
+        version = (
+            asyncio.create_task(_prefetch_attack_version(bundler))
+            if create_attack_navigator_layer
+            else None
+        )
+        text_observables = None
     else:
         bundler = Bundler(
             name, identity, tlp_level, input_text, labels, report_id=report_id, **kwargs
         )
-        detections = ai_provider.get_detections(input_text)
-    bundler.bundle_detections(detections)
-    if create_attack_navigator_layer:
-        bundler.create_attack_navigator()
+        version = (
+            asyncio.create_task(_prefetch_attack_version(bundler))
+            if create_attack_navigator_layer
+            else None
+        )
+        stop_scan = threading.Event()
+        text_observables = (
+            asyncio.create_task(
+                asyncio.to_thread(
+                    observables.find_text_observables, input_text, stop=stop_scan
+                )
+            )
+            if kwargs.get("extract_text_observables")
+            else None
+        )
+        try:
+            detections = await asyncio.to_thread(ai_provider.get_detections, input_text)
+        except BaseException:
+            # the rest of the text is not scanned for a failed run
+            stop_scan.set()
+            raise
+    if stream_output is not None:
+        bundler.stream_to(open_output(bundler, **stream_output))
+    try:
+        await asyncio.to_thread(bundler.bundle_detections, detections)
+        if text_observables:
+            bundler.add_text_observables(await text_observables)
+        if create_attack_navigator_layer:
+            await version
+            bundler.create_attack_navigator()
+    except BaseException:
+        if bundler.writer:
+            output_dir = bundler.writer.path.parent
+            bundler.abort_stream()
+            # only there if this run created it
+            with contextlib.suppress(OSError):
+                output_dir.rmdir()
+        raise
+    if bundler.writer:
+        bundler.close_stream()
     return bundler
 
 
-def get_sigma_detections(sigma: str, name=None) -> SigmaRuleDetection:
-    obj = yaml.safe_load(io.StringIO(sigma))
+def get_sigma_detections(sigma: str | dict, name=None) -> SigmaRuleDetection:
+    obj = sigma if isinstance(sigma, dict) else sigma_yaml.load(sigma)
     if not isinstance(obj, dict):
         raise ValueError(
             f"bad sigma input file. expected object/dict, got {type(obj)}."
@@ -313,12 +557,334 @@ def get_sigma_detections(sigma: str, name=None) -> SigmaRuleDetection:
     return SigmaRuleDetection.model_validate(obj)
 
 
+def find_sigma_files(patterns: list[str]) -> list[Path]:
+    """
+    Sigma files and archives of sigma files matched by `patterns`, each is a
+    directory (searched recursively), a file or a glob pattern
+    """
+    files = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = (
+                p
+                for p in path.rglob("*")
+                if sigma_collection.is_rule_file(p.name)
+                or sigma_collection.is_archive(p.name)
+            )
+        elif path.is_file():
+            matches = [path]
+        else:
+            matches = map(Path, glob.glob(pattern, recursive=True))
+        files.update((p, None) for p in sorted(matches) if p.is_file())
+    return list(files)
+
+
+def iter_sigma_rules(files: list[Path]):
+    """
+    Label and content of every rule in `files`. A file, archive member or
+    document that cannot be read is yielded with the exception instead of a
+    rule, the label of the n-th rule of a file is `<file>#<n>` after the first.
+    """
+    for path in files:
+        try:
+            for name, stream in sigma_collection.iter_sources(path):
+                label = name
+                try:
+                    for i, rule in enumerate(
+                        sigma_collection.iter_collection(stream), 1
+                    ):
+                        yield label, rule, None
+                        label = f"{name}#{i + 1}"
+                except Exception as e:
+                    yield label, None, e
+        except Exception as e:
+            yield path.as_posix(), None, e
+
+
+def warm_caches():
+    """
+    Loads the resources, local ATT&CK index and CVE database every rule
+    needs, so they are read once per worker instead of once per rule
+    """
+    for resource in resources.CachedResource.registry.values():
+        resource.load()
+    attack_index.get_index()
+    cve_store.get_store()
+
+
+def _init_sigma_worker():
+    # progress is shown by the parent, keep workers quiet on the console
+    for handler in logging.root.handlers:
+        if not isinstance(handler, logging.FileHandler):
+            handler.setLevel(logging.WARNING)
+    warm_caches()
+
+
+def _sigma_report_id(label: str, rule: dict, identity: Identity | None, created):
+    try:
+        return str(uuid.UUID(str(rule["id"])))
+    except (KeyError, ValueError):
+        return Bundler.generate_report_id(
+            identity.id if identity else None, created, label
+        )
+
+
+def _failed_result(label, e: Exception):
+    if isinstance(e, jsonschema.ValidationError):
+        # str(e) includes the whole schema
+        return dict(
+            path=label,
+            status="failed",
+            error=f"{type(e).__name__}: {e.json_path}: {e.message}",
+            schema_errors=getattr(e, "__notes__", []),
+        )
+    return dict(path=label, status="failed", error=f"{type(e).__name__}: {e}")
+
+
+def convert_sigma_rule(label: str, rule: dict, options: dict, combined=False) -> dict:
+    """
+    Converts one sigma rule, returns its result for the bulk report.
+
+    With `combined`, the bundle objects are returned instead of written.
+    """
+    try:
+        report_id = _sigma_report_id(
+            label, rule, options.get("identity"), options.get("created")
+        )
+        bundler = run_txt2detection(
+            name=None,
+            input_text="",
+            ai_provider=None,
+            sigma_file=rule,
+            report_id=report_id,
+            stream_output=(
+                None
+                if combined
+                else dict(
+                    bundle_format=options.get("bundle_format", "json"),
+                    compact=options.get("compact", False),
+                    compression=options.get("compression"),
+                )
+            ),
+            **{
+                k: v
+                for k, v in options.items()
+                if k not in ["bundle_format", "compact", "compression"]
+            },
+        )
+        result = dict(path=label)
+        if combined:
+            result.update(
+                objects=bundler.bundle_dict["objects"],
+                navigator_layer=bundler.data.navigator_layer,
+            )
+        else:
+            result.update(
+                output=str(write_output(bundler))
+            )
+        result.update(status="ok", report_id=report_id)
+        return result
+    except Exception as e:
+        logging.debug(f"converting `{label}` failed", exc_info=True)
+        return _failed_result(label, e)
+
+
+def _convert_in_order(jobs, workers):
+    """
+    Results of `jobs` in order. A job is a result, or a function and its
+    arguments to run in a pool of `workers` processes, with a few jobs per
+    worker in flight so rules are not all read ahead of the workers.
+    """
+    if workers == 1:
+        for job in jobs:
+            yield job if isinstance(job, dict) else job[0](*job[1:])
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_sigma_worker) as pool:
+        pending = collections.deque()
+        for job in jobs:
+            if isinstance(job, dict):
+                future = Future()
+                future.set_result(job)
+            else:
+                future = pool.submit(*job)
+            pending.append(future)
+            if len(pending) >= workers * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def run_sigma_dir(args) -> list[dict]:
+    """
+    Converts every rule in the files and archives matched by `--sigma_dir`
+    in a pool of worker processes, writes `sigma-dir-report.json` with the
+    result of each rule to the output directory and returns the results
+    """
+    files = find_sigma_files(args.sigma_dir)
+    logging.info(f"found {len(files)} sigma files")
+    options = dict(
+        identity=args.use_identity,
+        tlp_level=args.tlp_level,
+        labels=args.labels,
+        created=args.created,
+        external_refs=args.external_refs,
+        reference_urls=args.reference_urls,
+        license=args.license,
+        create_attack_navigator_layer=args.create_attack_navigator_layer,
+        status=args.status,
+        level=args.level,
+        bundle_format=args.bundle_format,
+        compact=args.compact,
+        compression=args.compression,
+    )
+    output_dir = Path("./output")
+    manifest = None
+    if getattr(args, "incremental", False):
+        manifest = Manifest.load(
+            output_dir / "sigma-dir-manifest.json", fingerprint(options)
+        )
+    hashes = {}
+    seen = set()
+    report_ids = {}  # report id -> first rule using it
+
+    def jobs():
+        for label, rule, error in iter_sigma_rules(files):
+            seen.add(label)
+            if error:
+                if manifest:
+                    # keep what was converted from it before
+                    seen.update(
+                        k for k in manifest.files if k.startswith((label + "/", label + "#"))
+                    )
+                yield _failed_result(label, error)
+                continue
+            unchanged = None
+            if manifest:
+                hashes[label] = rule_md5(rule)
+                if manifest.is_unchanged(label, hashes[label]):
+                    entry = manifest.files[label]
+                    unchanged = dict(
+                        path=label,
+                        status="unchanged",
+                        report_id=entry["report_id"],
+                        output=entry["output"],
+                    )
+            report_id = (
+                unchanged["report_id"]
+                if unchanged
+                else _sigma_report_id(
+                    label, rule, options["identity"], options["created"]
+                )
+            )
+            if report_id in report_ids:
+                # its bundle would replace the other rule's
+                yield _failed_result(
+                    label,
+                    ValueError(
+                        f"rule id `{report_id}` is also used by `{report_ids[report_id]}`"
+                    ),
+                )
+                continue
+            report_ids[report_id] = label
+            yield unchanged or (convert_sigma_rule, label, rule, options, args.combined)
+
+    # workers forked after this inherit the loaded caches, others read the
+    # refreshed on-disk cache
+    warm_caches()
+    workers = max(1, min(args.workers or 1, len(files)))
+    converted = _convert_in_order(jobs(), workers)
+    if args.combined:
+        converted = write_combined_output(output_dir, converted, files, options)
+    results = []
+    for result in tqdm(converted, unit="rule"):
+        if manifest and result["status"] == "ok":
+            previous = manifest.files.get(result["path"])
+            manifest.record(result["path"], hashes[result["path"]], result)
+            if previous:
+                _remove_stale_output(manifest, previous)
+        results.append(result)
+    if manifest:
+        for entry in manifest.remove_missing(seen):
+            _remove_stale_output(manifest, entry)
+        manifest.save()
+
+    failed = [r for r in results if r["status"] == "failed"]
+    for r in failed:
+        logging.error(f"`{r['path']}`: {r['error']}")
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / "sigma-dir-report.json").write_text(json.dumps(results, indent=4))
+    logging.info(
+        f"{sum(r['status'] == 'ok' for r in results)} converted, {sum(r['status'] == 'unchanged' for r in results)} unchanged and {len(failed)} failed of {len(results)} sigma rules, report written to `{output_dir / 'sigma-dir-report.json'}`"
+    )
+    return results
+
+
+def _remove_stale_output(manifest: Manifest, entry: dict):
+    # rules sharing an id share their output
+    if all(e["output"] != entry["output"] for e in manifest.files.values()):
+        shutil.rmtree(Path(entry["output"]).parent, ignore_errors=True)
+
+
+def write_combined_output(output_dir: Path, results, files: list[Path], options):
+    """
+    Writes the objects of every converted rule to one bundle as `results`
+    arrive and yields the results without them, objects shared between rules
+    (identities, markings, ATT&CK objects...) are written once
+    """
+    bundle_id = "bundle--" + str(
+        uuid.uuid5(
+            UUID_NAMESPACE,
+            "+".join([fingerprint(options), *sorted(str(path) for path in files)]),
+        )
+    )
+    output_dir = output_dir / bundle_id
+    shutil.rmtree(output_dir, ignore_errors=True)
+    output_path = output_dir / (
+        f"bundle.{options['bundle_format']}"
+        + bundle_writer.COMPRESSIONS[options["compression"]]
+    )
+    seen = set()
+    with bundle_writer.BundleWriter(
+        output_path,
+        bundle_id,
+        format=options["bundle_format"],
+        compact=options["compact"],
+        compression=options["compression"],
+    ) as writer:
+        for result in results:
+            if result["status"] == "ok":
+                objects = result.pop("objects")
+                for obj in objects:
+                    if obj["id"] not in seen:
+                        seen.add(obj["id"])
+                        writer.write(obj)
+                write_rules(
+                    output_dir / "rules", objects, result.pop("navigator_layer")
+                )
+                result["output"] = str(output_path)
+            yield result
+    logging.info(f"Writing combined bundle output to `{output_path}`")
+
+
 def main(args: Args):
+    if getattr(args, "mode", None) == "sigma-dir":
+        setLogFile(
+            logging.root,
+            Path(f"logs/log-sigma-dir-{datetime.now(UTC):%Y%m%dT%H%M%S}.log"),
+        )
+        results = run_sigma_dir(args)
+        sys.exit(19 if any(r["status"] == "failed" for r in results) else 0)
 
     setLogFile(logging.root, Path(f"logs/log-{args.report_id}.log"))
     logging.info(f"starting argument: {json.dumps(sys.argv[1:])}")
     kwargs = args.__dict__
     kwargs["identity"] = args.use_identity
+    kwargs["stream_output"] = dict(
+        bundle_format=getattr(args, "bundle_format", "json"),
+        compact=getattr(args, "compact", False),
+        compression=getattr(args, "compression", None),
+    )
     try:
         bundler = run_txt2detection(**kwargs)
     except (ValidationError, ValueError) as e:
@@ -328,24 +894,78 @@ def main(args: Args):
             logging.debug(f"Validate sigma file failed: {full_error}", exc_info=True)
         sys.exit(19)
 
-    output_dir = Path("./output") / str(bundler.bundle.id)
-    shutil.rmtree(output_dir, ignore_errors=True)
-    rules_dir = output_dir / "rules"
-    rules_dir.mkdir(exist_ok=True, parents=True)
+    output_path = write_output(
+        bundler,
+        bundle_format=getattr(args, "bundle_format", "json"),
+        compact=getattr(args, "compact", False),
+        compression=getattr(args, "compression", None),
+    )
+    logging.info(f"Writing bundle output to `{output_path}`")
+
+
+def output_path(bundle_id, bundle_format="json", compression=None) -> Path:
+    return (
+        Path("./output")
+        / str(bundle_id)
+        / (f"bundle.{bundle_format}" + bundle_writer.COMPRESSIONS[compression])
+    )
+
 
-    output_path = output_dir / "bundle.json"
-    data_path = output_dir / f"data.json"
-    output_path.write_text(bundler.to_json())
-    data_path.write_text(bundler.data.model_dump_json(indent=4))
-    for obj in bundler.bundle["objects"]:
+def open_output(bundler: Bundler, bundle_format="json", compact=False, compression=None):
+    """
+    Opens a `BundleWriter` for the bundle in `output/<bundle id>/`, the
+    previous output is kept until `write_output()`
+    """
+    path = output_path(bundler.bundle.id, bundle_format, compression)
+    return bundle_writer.BundleWriter(
+        path,
+        bundler.bundle.id,
+        format=bundle_format,
+        compact=compact,
+        compression=compression,
+    ).open()
+
+
+def write_output(bundler: Bundler, bundle_format="json", compact=False, compression=None):
+    """
+    Writes the bundle, data.json and one file per rule to
+    `output/<bundle id>/`, returns the path of the bundle. A bundle streamed
+    by `arun_txt2detection` is already there and is not written again.
+    """
+    if bundler.stream_path:
+        path = bundler.stream_path
+        for entry in path.parent.iterdir():
+            if entry == path:
+                continue
+            if entry.is_dir():
+                shutil.rmtree(entry)
+            else:
+                entry.unlink()
+    else:
+        path = output_path(bundler.bundle.id, bundle_format, compression)
+        shutil.rmtree(path.parent, ignore_errors=True)
+        bundler.write_bundle(
+            path,
+            format=bundle_format,
+            compact=compact,
+            compression=compression,
+        )
+    output_dir = path.parent
+    (output_dir / "data.json").write_text(bundler.data.model_dump_json(indent=4))
+    write_rules(
+        output_dir / "rules", bundler.bundle["objects"], bundler.data.navigator_layer
+    )
+    return path
+
+
+def write_rules(rules_dir: Path, objects, navigator_layer: dict | None):
+    rules_dir.mkdir(exist_ok=True, parents=True)
+    for obj in objects:
         if obj["type"] != "indicator" or obj["pattern_type"] != "sigma":
             continue
         rule_id: str = obj["id"].replace("indicator--", "")
         rule_path = rules_dir / ("rule--" + rule_id + ".yml")
         nav_path = rules_dir / f"attack-enterprise-navigator-layer-rule--{rule_id}.json"
         rule_path.write_text(obj["pattern"])
-        if rule_nav := (
-            bundler.data.navigator_layer and bundler.data.navigator_layer.get(rule_id)
-        ):
+        if rule_nav := (navigator_layer and navigator_layer.get(rule_id)):
             nav_path.write_text(json.dumps(rule_nav, indent=4))
-    logging.info(f"Writing bundle output to `{output_path}`")
@@ -1,16 +1,60 @@
+import importlib
 import logging
+from collections.abc import Mapping
+import typing
 
 import dotenv
 
-from .base import _ai_extractor_registry as ALL_AI_EXTRACTORS
+if typing.TYPE_CHECKING:
+    from .base import BaseAIExtractor
 
-from .base import BaseAIExtractor
 
 class ModelError(Exception):
     pass
 
-for path in ["openai", "anthropic", "gemini", "deepseek", "openrouter"]:
-    try:
-        __import__(__package__ + "." + path)
-    except Exception as e:
-        logging.warning("%s not supported, please install missing modules", path, exc_info=True)
\ No newline at end of file
+
+class _LazyExtractorRegistry(Mapping):
+    """
+    Maps provider name to extractor class, a provider's module (and its
+    llama-index integration) is only imported the first time it is looked up.
+    """
+
+    providers = ["openai", "anthropic", "gemini", "deepseek", "openrouter"]
+
+    def __getitem__(self, provider) -> "type[BaseAIExtractor]":
+        if provider not in self.providers:
+            raise KeyError(provider)
+        from .base import _ai_extractor_registry
+
+        if provider not in _ai_extractor_registry:
+            try:
+                importlib.import_module(__package__ + "." + provider)
+            except Exception as e:
+                logging.warning(
+                    "%s not supported, please install missing modules",
+                    provider,
+                    exc_info=True,
+                )
+                raise ModelError(f"AI provider `{provider}` is not installed") from e
+        return _ai_extractor_registry[provider]
+
+    def __iter__(self):
+        return iter(self.providers)
+
+    def __len__(self):
+        return len(self.providers)
+
+    def __contains__(self, provider):
+        return provider in self.providers
+
+
+ALL_AI_EXTRACTORS = _LazyExtractorRegistry()
+
+
+def __getattr__(name):
+    # BaseAIExtractor pulls in llama-index, only import it when asked for
+    if name == "BaseAIExtractor":
+        from .base import BaseAIExtractor
+
+        return BaseAIExtractor
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,5 +1,8 @@
+import io
 import logging
 from typing import Type
+import json_repair
+from llama_index.core.output_parsers import PydanticOutputParser
 from llama_index.core.program import LLMTextCompletionProgram
 
 import textwrap
@@ -7,7 +10,7 @@ from llama_index.core.llms.llm import LLM
 
 from txt2detection.ai_extractor import prompts
 
-from txt2detection.ai_extractor.utils import ParserWithLogging
+from txt2detection.ai_extractor.utils import BadAIOutput
 from txt2detection.models import DetectionContainer, DetectionContainer
 from llama_index.core.utils import get_tokenizer
 
@@ -15,6 +18,21 @@ from llama_index.core.utils import get_tokenizer
 _ai_extractor_registry: dict[str, "Type[BaseAIExtractor]"] = {}
 
 
+class ParserWithLogging(PydanticOutputParser):
+    def parse(self, text: str):
+        f = io.StringIO()
+        print("\n" * 5 + "=================start=================", file=f)
+        print(text, file=f)
+        print("=================close=================" + "\n" * 5, file=f)
+        logging.debug(f.getvalue())
+        try:
+            repaired_json = json_repair.repair_json(text)
+            return super().parse(repaired_json)
+        except Exception as e:
+            logging.exception(e)
+            raise BadAIOutput("Unparsable output returned by LLM model") from e
+
+
 class BaseAIExtractor:
     llm: LLM
     TIMEOUT = 180
@@ -0,0 +1,89 @@
+"""
+In-memory index of an ATT&CK Enterprise STIX bundle, used instead of CTI
+Butler when `ATTACK_ENTERPRISE_BUNDLE` points to a bundle on disk, e.g.
+https://github.com/mitre-attack/attack-stix-data/raw/master/enterprise-attack/enterprise-attack.json
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+
+
+logger = logging.getLogger("txt2detection.attack_index")
+
+
+def _is_current(obj):
+    return not obj.get("revoked") and not obj.get("x_mitre_deprecated")
+
+
+def _attack_id(obj):
+    for ref in obj.get("external_references", []):
+        if ref.get("source_name") == "mitre-attack" and ref.get("external_id"):
+            return ref["external_id"]
+    return None
+
+
+class AttackIndex:
+    """
+    Revoked and deprecated objects are not indexed, like CTI Butler only the
+    current version of each object is served
+    """
+
+    def __init__(self, objects: list[dict], version=None):
+        self.version = version
+        self.by_external_id: dict[str, list[dict]] = {}
+
+        for obj in objects:
+            if obj["type"] == "x-mitre-collection":
+                self.version = self.version or obj.get("x_mitre_version")
+                continue
+            if not _is_current(obj):
+                continue
+            attack_id = _attack_id(obj)
+            if not attack_id:
+                continue
+            self.by_external_id.setdefault(attack_id.upper(), []).append(obj)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, "rb") as f:
+            bundle = json.load(f)
+        index = cls(bundle["objects"])
+        logger.info(
+            "loaded ATT&CK %s index from %s, %d ids",
+            index.version,
+            path,
+            len(index.by_external_id),
+        )
+        return index
+
+    def get_objects(self, attack_ids) -> list[dict]:
+        objects = {}
+        for attack_id in attack_ids:
+            for obj in self.by_external_id.get(attack_id.upper(), []):
+                objects.setdefault(obj["id"], obj)
+        return list(objects.values())
+
+
+_index: AttackIndex = None
+_index_path = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> AttackIndex | None:
+    """
+    Index of the bundle at `ATTACK_ENTERPRISE_BUNDLE`, loaded once per process,
+    None if the variable is not set
+    """
+    global _index, _index_path
+    path = os.getenv("ATTACK_ENTERPRISE_BUNDLE")
+    if not path:
+        return None
+    path = Path(path).expanduser()
+    with _index_lock:
+        if _index is None or _index_path != path:
+            _index = AttackIndex.from_file(path)
+            _index_path = path
+        return _index
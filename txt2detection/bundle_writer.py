@@ -0,0 +1,115 @@
+"""
+Writes a STIX bundle to disk one object at a time, so the serialized bundle
+is never held in memory as a whole.
+
+Output is written to a temporary file that replaces `path` on `close()`, a
+failed run leaves no partial bundle behind.
+"""
+
+import gzip
+import io
+import json
+import os
+from pathlib import Path
+
+from stix2.serialization import STIXJSONEncoder
+
+
+FORMATS = ["json", "ndjson"]
+COMPRESSIONS = {None: "", "gzip": ".gz", "zstd": ".zst"}
+
+
+def _open_zstd(path):
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "zstd compression requires the `zstandard` package, install txt2detection[zstd]"
+        ) from e
+    raw = open(path, "wb")
+    return io.TextIOWrapper(
+        zstandard.ZstdCompressor().stream_writer(raw, closefd=True), encoding="utf-8"
+    )
+
+
+class BundleWriter:
+    """
+    `json` output is a bundle, indented like `Bundler.to_json()` unless
+    `compact`, `ndjson` output is one compact object per line.
+    """
+
+    def __init__(
+        self, path, bundle_id, format="json", compact=False, compression=None
+    ):
+        if format not in FORMATS:
+            raise ValueError(f"unsupported bundle format `{format}`")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"unsupported compression `{compression}`")
+        self.path = Path(path)
+        self.bundle_id = bundle_id
+        self.format = format
+        self.compact = compact or format == "ndjson"
+        self.compression = compression
+        self.count = 0
+        self._tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        self._file = None
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.compression == "gzip":
+            self._file = gzip.open(self._tmp_path, "wt", encoding="utf-8")
+        elif self.compression == "zstd":
+            self._file = _open_zstd(self._tmp_path)
+        else:
+            self._file = open(self._tmp_path, "w", encoding="utf-8")
+        if self.format == "json":
+            if self.compact:
+                self._file.write(
+                    '{"type":"bundle","id":%s,"objects":[' % json.dumps(self.bundle_id)
+                )
+            else:
+                self._file.write(
+                    '{\n    "type": "bundle",\n    "id": %s,\n    "objects": ['
+                    % json.dumps(self.bundle_id)
+                )
+        return self
+
+    def write(self, obj):
+        if self.compact:
+            data = json.dumps(obj, cls=STIXJSONEncoder, separators=(",", ":"))
+        else:
+            data = json.dumps(obj, cls=STIXJSONEncoder, indent=4)
+        if self.format == "ndjson":
+            self._file.write(data + "\n")
+        elif self.compact:
+            self._file.write(("," if self.count else "") + data)
+        else:
+            self._file.write(
+                ("," if self.count else "")
+                + "\n"
+                + "\n".join("        " + line for line in data.splitlines())
+            )
+        self.count += 1
+
+    def close(self):
+        if self.format == "json":
+            if self.compact:
+                self._file.write("]}")
+            else:
+                self._file.write("\n    ]\n}" if self.count else "]\n}")
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        if self._file:
+            self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
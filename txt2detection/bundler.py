@@ -1,23 +1,37 @@
+from concurrent.futures import ThreadPoolExecutor
 import contextlib
 import enum
 import itertools
 import json
 import logging
+import math
 import os
+from pathlib import Path
+import threading
 from urllib.parse import urljoin
-import requests
 from stix2 import (
     Report,
     Identity,
+    Indicator,
     MarkingDefinition,
     Relationship,
     Bundle,
 )
+from stix2.base import _STIXBase
 from stix2.serialization import serialize
 import hashlib
 
-from txt2detection import attack_navigator, observables
+from txt2detection import (
+    attack_index,
+    attack_navigator,
+    cve_store,
+    enrichment_cache,
+    http_client,
+    observables,
+    stix_builder,
+)
 from txt2detection.ai_extractor.utils import AIDetectionFailure
+from txt2detection.bundle_writer import BundleWriter
 from txt2detection.models import (
     AIDetection,
     BaseDetection,
@@ -30,18 +44,22 @@ from txt2detection.models import (
 
 from datetime import UTC, datetime as dt
 import uuid
-from stix2 import parse as parse_stix
 
 from txt2detection.models import TLP_LEVEL
+from txt2detection.resources import (
+    DATA_SOURCE_EXTENSION_DEFINITION,
+    SIGMA_EXTENSION_DEFINITION,
+)
 from txt2detection.utils import (
     STATUSES,
-    load_stix_object_from_url,
     remove_rule_specific_tags,
 )
 
 
 logger = logging.getLogger("txt2detection.bundler")
 
+PAGE_SIZE = 1000
+
 
 class Bundler:
     identity = None
@@ -88,12 +106,8 @@ class Bundler:
         }
     )
 
-    sigma_extension_definition = load_stix_object_from_url(
-        "https://github.com/muchdogesec/stix2extensions/raw/refs/heads/main/automodel_generated/extension-definitions/properties/indicator-sigma-rule.json"
-    )
-    data_source_extension_definition = load_stix_object_from_url(
-        "https://raw.githubusercontent.com/muchdogesec/stix2extensions/refs/heads/main/automodel_generated/extension-definitions/scos/data-source.json"
-    )
+    sigma_extension_definition = SIGMA_EXTENSION_DEFINITION
+    data_source_extension_definition = DATA_SOURCE_EXTENSION_DEFINITION
 
     @classmethod
     def generate_report_id(cls, created_by_ref, created, name):
@@ -127,7 +141,11 @@ class Bundler:
         self.labels = labels or []
         self.license = license
 
-        self.all_objects = set()
+        self.writer: BundleWriter = None
+        self.stream_path: Path = None
+        self.all_objects: dict[str, dict] = {}
+        self.objects_by_type: dict[str, list[dict]] = {}
+        self.report_refs: dict[str, None] = {}  # ordered set of report.object_refs
         self.job_id = f"report--{self.uuid}"
         self.external_refs = (external_refs or []) + [
             dict(
@@ -140,6 +158,11 @@ class Bundler:
         self.data = DataContainer.model_construct()
         self.tactics = {}
         self.techniques = {}
+        self._attack_objects: dict[str, list] = {}
+        self._cve_objects: dict[str, list] = {}
+        self._attack_version = None
+        self._attack_version_lock = threading.Lock()
+        self._attack_version_failed = False
 
         self.report = Report(
             created_by_ref=self.identity.id,
@@ -172,19 +195,87 @@ class Bundler:
         self.bundle = Bundle(objects=[self.tlp_level.value], id=f"bundle--{self.uuid}")
 
         self.bundle.objects.extend([self.default_marking, self.identity, self.report])
+        for obj in self.bundle.objects:
+            self._index(obj)
         # add default STIX 2.1 marking definition for txt2detection
         self.report.object_marking_refs.append(self.default_marking.id)
         self.add_ref(self.sigma_extension_definition)
         self.add_ref(self.data_source_extension_definition)
 
+    def _index(self, sdo):
+        self.all_objects[sdo["id"]] = sdo
+        self.objects_by_type.setdefault(sdo["type"], []).append(sdo)
+
+    def _is_retained(self, sdo):
+        # indicators are needed for the rule files and navigator layers
+        return not self.writer or sdo["type"] == "indicator" or sdo is self.report
+
     def add_ref(self, sdo, append_report=False):
         sdo_id = sdo["id"]
         if sdo_id in self.all_objects:
             return
-        self.bundle.objects.append(sdo)
-        if sdo_id not in self.report.object_refs and append_report:
+        if sdo_id not in self.report_refs and append_report:
+            self.report_refs[sdo_id] = None
             self.report.object_refs.append(sdo_id)
-        self.all_objects.add(sdo_id)
+        if self.writer:
+            self.writer.write(sdo)
+        if self._is_retained(sdo):
+            self.bundle.objects.append(sdo)
+            self._index(sdo)
+        else:
+            self.all_objects[sdo_id] = None
+
+    def stream_to(self, writer: BundleWriter):
+        """
+        Write objects to the (open) `writer` as they are added, instead of
+        keeping them all in memory. Only indicators and the report stay in
+        `bundle.objects`, other objects are released once written and map to
+        None in `all_objects`.
+
+        The report is written last by `close_stream()`, when its object_refs
+        are complete. `to_json()`, `bundle_dict` and `write_bundle()` raise
+        a RuntimeError once streaming started, the bundle is only complete
+        on disk.
+        """
+        self.writer = writer
+        for obj in self.bundle.objects:
+            if obj is not self.report:
+                writer.write(obj)
+        self.bundle.objects[:] = list(filter(self._is_retained, self.bundle.objects))
+        for obj_id, obj in self.all_objects.items():
+            if obj is not None and not self._is_retained(obj):
+                self.all_objects[obj_id] = None
+        for obj_type in list(self.objects_by_type):
+            self.objects_by_type[obj_type] = list(
+                filter(self._is_retained, self.objects_by_type[obj_type])
+            )
+
+    def close_stream(self):
+        self.writer.write(self.report)
+        self.writer.close()
+        self.stream_path = self.writer.path
+        self.writer = None
+
+    def abort_stream(self):
+        self.writer.abort()
+        self.writer = None
+
+    def _check_not_streamed(self):
+        if self.writer or self.stream_path:
+            path = self.stream_path or self.writer.path
+            raise RuntimeError(
+                f"bundle is streamed to {path}, only its indicators and report are in memory"
+            )
+
+    def write_bundle(self, path, **options):
+        """
+        Write the bundle to `path` one object at a time, `options` are passed
+        to `BundleWriter`
+        """
+        self._check_not_streamed()
+        with BundleWriter(path, self.bundle.id, **options) as writer:
+            for obj in self.bundle.objects:
+                writer.write(obj)
 
     def add_rule_indicator(self, detection: SigmaRuleDetection):
         indicator_types = getattr(detection, "indicator_types", None)
@@ -208,7 +299,7 @@ class Bundler:
             "pattern": detection.make_rule(self),
             "valid_from": self.report.created,
             "object_marking_refs": self.report.object_marking_refs,
-            "external_references": self.external_refs,
+            "external_references": list(self.external_refs),
             "extensions": {
                 self.sigma_extension_definition["id"]: {
                     "extension_type": "toplevel-property-extension"
@@ -261,7 +352,7 @@ class Bundler:
             self.add_relation(indicator, obj)
             self.data.cves[obj["name"]] = obj["id"]
 
-        self.add_ref(parse_stix(indicator, allow_custom=True), append_report=True)
+        self.add_ref(stix_builder.build(Indicator, **indicator), append_report=True)
         self.add_ref(logsource, append_report=True)
         self.add_relation(
             indicator,
@@ -270,8 +361,8 @@ class Bundler:
         )
 
         self.data.observables = []
-        for ob_type, ob_value in set(
-            observables.find_stix_observables(detection.detection)
+        for ob_type, ob_value in observables.find_stix_observables(
+            detection.detection
         ):
             self.data.observables.append(dict(type=ob_type, value=ob_value))
             try:
@@ -282,6 +373,20 @@ class Bundler:
                 self.data.observables[-1]["error"] = str(e)
                 logger.exception(f"failed to process observable {ob_type}/{ob_value}")
 
+    def add_text_observables(self, found: list[tuple[str, str]]):
+        """
+        Adds the observables `found` in the input text to the report
+        """
+        self.data.text_observables = []
+        for ob_type, ob_value in found:
+            self.data.text_observables.append(dict(type=ob_type, value=ob_value))
+            try:
+                obj = observables.to_stix_object(ob_type, ob_value)
+                self.add_ref(obj, append_report=True)
+            except Exception as e:
+                self.data.text_observables[-1]["error"] = str(e)
+                logger.exception(f"failed to process observable {ob_type}/{ob_value}")
+
     def add_relation(
         self,
         indicator,
@@ -305,7 +410,8 @@ class Bundler:
             )
             description = f"{indicator['name']} {relationship_type} {target_name}"
 
-        rel = Relationship(
+        rel = stix_builder.build(
+            Relationship,
             id="relationship--"
             + str(
                 uuid.uuid5(UUID_NAMESPACE, f"{indicator['id']}+{target_object['id']}")
@@ -319,20 +425,70 @@ class Bundler:
             modified=self.report.modified,
             object_marking_refs=self.report.object_marking_refs,
             external_references=ext_refs,
-            allow_custom=True,
         )
         self.add_ref(rel)
 
     def to_json(self):
+        self._check_not_streamed()
         return serialize(self.bundle, indent=4)
 
     @property
     def bundle_dict(self):
-        return json.loads(self.to_json())
+        """
+        The bundle as JSON-compatible dicts, without serializing the whole
+        bundle. Objects that are already dicts are shared, not copied.
+        """
+        self._check_not_streamed()
+        return dict(
+            type="bundle",
+            id=self.bundle.id,
+            objects=[
+                json.loads(serialize(obj)) if isinstance(obj, _STIXBase) else obj
+                for obj in self.bundle.objects
+            ],
+        )
 
     def get_attack_objects(self, attack_ids):
+        """
+        ATT&CK objects for `attack_ids`, only ids not already resolved by this
+        bundler are requested from CTI Butler
+        """
         if not attack_ids:
             return []
+        return self._resolve_ids(
+            self._attack_objects,
+            attack_ids,
+            self._fetch_attack_objects,
+            lambda obj: obj["external_references"][0]["external_id"],
+            self._attack_cache_namespace,
+        )
+
+    def _attack_cache_namespace(self):
+        if attack_index.get_index() or self._attack_version_failed:
+            return None
+        try:
+            return f"attack-enterprise:{self.attack_version}"
+        except Exception as e:
+            # not looked up again for the cache, navigator layers still retry
+            self._attack_version_failed = True
+            logger.warning(f"not caching attack objects, version lookup failed: {e}")
+            return None
+
+    @property
+    def attack_version(self):
+        """
+        `get_attack_version()`, looked up once per bundler
+        """
+        # prefetched by arun_txt2detection while detections are bundled
+        with self._attack_version_lock:
+            if self._attack_version is None:
+                self._attack_version = self.get_attack_version()
+        return self._attack_version
+
+    @classmethod
+    def _fetch_attack_objects(cls, attack_ids):
+        if index := attack_index.get_index():
+            return index.get_objects(attack_ids)
         logger.debug(f"retrieving attack objects: {attack_ids}")
         endpoint = urljoin(
             os.environ["CTIBUTLER_BASE_URL"] + "/",
@@ -343,21 +499,58 @@ class Bundler:
         if api_key := os.environ.get("CTIBUTLER_API_KEY"):
             headers["API-KEY"] = api_key
 
-        return self._get_objects(endpoint, headers)
+        return cls._get_objects(endpoint, headers)
 
     @classmethod
     def get_attack_version(cls):
+        if index := attack_index.get_index():
+            return index.version
         headers = {}
         api_root = os.environ["CTIBUTLER_BASE_URL"] + "/"
         if api_key := os.environ.get("CTIBUTLER_API_KEY"):
             headers["API-KEY"] = api_key
         version_url = urljoin(api_root, f"v1/attack-enterprise/versions/installed/")
-        return requests.get(version_url, headers=headers).json()["latest"]
-
-    @classmethod
-    def get_cve_objects(cls, cve_ids):
+        resp = http_client.get_session().get(version_url, headers=headers)
+        resp.raise_for_status()
+        return resp.json()["latest"]
+
+    def get_cve_objects(self, cve_ids):
+        """
+        Vulnerabilities for `cve_ids`, only ids not already resolved by this
+        bundler are requested from Vulmatch
+        """
         if not cve_ids:
             return []
+        return self._resolve_ids(
+            self._cve_objects,
+            cve_ids,
+            self._fetch_cve_objects,
+            lambda obj: obj["name"],
+            lambda: None if os.getenv("CVE_DATABASE") else "cve",
+        )
+
+    def _resolve_ids(self, resolved: dict, ids, fetch, key, cache_namespace):
+        """
+        Objects for `ids` from, in order, the ids already resolved by this
+        bundler, the enrichment cache (if enabled and `cache_namespace()`
+        is not None) and `fetch`
+        """
+        missing = _unresolved(resolved, ids)
+        cache = enrichment_cache.get_cache() if missing else None
+        namespace = cache_namespace() if cache else None
+        if namespace:
+            resolved.update(cache.get_many(namespace, [i.upper() for i in missing]))
+            missing = _unresolved(resolved, missing)
+        if missing:
+            _group_by(resolved, missing, fetch(missing), key)
+            if namespace:
+                cache.set_many(namespace, {i.upper(): resolved[i.upper()] for i in missing})
+        return _resolved(resolved, ids)
+
+    @classmethod
+    def _fetch_cve_objects(cls, cve_ids):
+        if (store := cve_store.get_store()) is not None:
+            return store.get_objects(cve_ids)
         logger.debug(f"retrieving cve objects: {cve_ids}")
         endpoint = urljoin(
             os.environ["VULMATCH_BASE_URL"] + "/",
@@ -371,32 +564,80 @@ class Bundler:
 
     @classmethod
     def _get_objects(cls, endpoint, headers):
-        data = []
-        page = 1
-        while True:
-            resp = requests.get(
-                endpoint, params=dict(page=page, page_size=1000), headers=headers
+        """
+        All objects of a paginated CTI Butler / Vulmatch endpoint.
+
+        When the first page reports `total_results_count`, the remaining pages
+        are fetched concurrently (up to ENRICHMENT_PAGE_WORKERS at a time),
+        otherwise pages are walked one by one. Objects are always returned in
+        page order.
+        """
+        session = http_client.get_session()
+
+        def get_page(page):
+            resp = session.get(
+                endpoint, params=dict(page=page, page_size=PAGE_SIZE), headers=headers
             )
-            if resp.status_code != 200:
-                break
-            d = resp.json()
-            if len(d["objects"]) == 0:
-                break
-            data.extend(d["objects"])
+            if resp.status_code == 404 and page > 1:
+                # previous page was full and was also the last one
+                return None
+            resp.raise_for_status()
+            return resp.json()
+
+        d = get_page(1)
+        data = list(d["objects"])
+        total = d.get("total_results_count")
+        workers = int(os.getenv("ENRICHMENT_PAGE_WORKERS") or 4)
+        if total is not None and workers > 1:
+            page_count = math.ceil(total / d.get("page_size", PAGE_SIZE))
+            if page_count < 2:
+                return data
+            with ThreadPoolExecutor(min(workers, page_count - 1)) as executor:
+                for d in executor.map(get_page, range(2, page_count + 1)):
+                    if d:
+                        data.extend(d["objects"])
+            return data
+
+        page = 1
+        while d and d["objects"] and d["page_results_count"] >= d["page_size"]:
             page += 1
-            if d["page_results_count"] < d["page_size"]:
-                break
+            d = get_page(page)
+            if d:
+                data.extend(d["objects"])
         return data
 
+    def prefetch_enrichment(self, detections: list[BaseDetection]):
+        """
+        Resolve the ATT&CK and CVE ids of all `detections` with one request per
+        service, `add_rule_indicator` then only reads from the resolved objects
+        """
+        attack_ids, cve_ids = {}, {}
+        for detection in detections:
+            attack_ids.update(dict.fromkeys(detection.mitre_attack_ids))
+            cve_ids.update(dict.fromkeys(detection.cve_ids))
+        if not (attack_ids and cve_ids):
+            self.get_attack_objects(list(attack_ids))
+            self.get_cve_objects(list(cve_ids))
+            return
+        # the two services are independent, resolve them concurrently
+        with ThreadPoolExecutor(2) as executor:
+            attack = executor.submit(self.get_attack_objects, list(attack_ids))
+            cves = executor.submit(self.get_cve_objects, list(cve_ids))
+            attack.result(), cves.result()
+
     def bundle_detections(self, container: DetectionContainer):
         self.data.detections = container
         if not container.success:
             raise AIDetectionFailure(container.fail_reason)
+        self.prefetch_enrichment(container.detections)
         for d in container.detections:
             self.add_rule_indicator(d)
+        if cache := enrichment_cache.get_cache():
+            logger.info(f"enrichment cache: {cache.stats()}")
+        logger.info(f"observable cache: {observables.cache_stats()}")
 
     def create_attack_navigator(self):
-        self.mitre_version = self.get_attack_version()
+        self.mitre_version = self.attack_version
         all_tactics = dict(
             itertools.chain(*map(lambda x: x.items(), self.tactics.values()))
         )
@@ -413,11 +654,7 @@ class Bundler:
                     for technique in techniques
                 ]
             )
-            indicator = [
-                f
-                for f in self.bundle.objects
-                if str(f["id"]).endswith(str(detection_id)) and f["type"] == "indicator"
-            ][0]
+            indicator = self.all_objects[f"indicator--{detection_id}"]
             self.data.navigator_layer[detection_id] = (
                 attack_navigator.create_navigator_layer(
                     self.report, indicator, mapping, self.mitre_version
@@ -425,6 +662,25 @@ class Bundler:
             )
 
 
+def _unresolved(resolved: dict, ids):
+    return list(dict.fromkeys(i for i in ids if i.upper() not in resolved))
+
+
+def _group_by(resolved: dict, requested_ids, objects, key):
+    for i in requested_ids:
+        resolved.setdefault(i.upper(), [])
+    for obj in objects:
+        resolved.setdefault(key(obj).upper(), []).append(obj)
+
+
+def _resolved(resolved: dict, ids):
+    objects = {}
+    for i in ids:
+        for obj in resolved.get(i.upper(), []):
+            objects.setdefault(obj["id"], obj)
+    return list(objects.values())
+
+
 def make_logsouce_string(source: dict):
     d = [
         f"{k}={v}" for k, v in source.items() if k in ["product", "service", "category"]
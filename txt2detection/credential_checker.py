@@ -2,7 +2,8 @@ import argparse
 import os
 import random
 from urllib.parse import urljoin
-import requests
+
+from txt2detection import http_client
 
 
 def check_llms():
@@ -21,21 +22,21 @@ def check_llms():
 
 
 def check_ctibutler_vulmatch(service):
-    session = requests.Session()
+    headers = {}
     if service == "vulmatch":
         base_url = os.getenv("VULMATCH_BASE_URL")
         url = urljoin(
             base_url,
             "v1/cve/objects/vulnerability--f552f6f4-39da-48dc-8717-323772c99588/",
         )
-        session.headers["API-KEY"] = os.environ.get("VULMATCH_API_KEY")
+        headers["API-KEY"] = os.environ.get("VULMATCH_API_KEY")
     elif service == "ctibutler":
         base_url = os.getenv("CTIBUTLER_BASE_URL")
         url = urljoin(base_url, "v1/location/versions/available/")
-        session.headers["API-KEY"] = os.environ.get("CTIBUTLER_API_KEY")
+        headers["API-KEY"] = os.environ.get("CTIBUTLER_API_KEY")
 
     try:
-        resp = session.get(url)
+        resp = http_client.get_session().get(url, headers=headers)
         match resp.status_code:
             case 401 | 403:
                 return "unauthorized"
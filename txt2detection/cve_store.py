@@ -0,0 +1,116 @@
+"""
+Local CVE database, used instead of Vulmatch when `CVE_DATABASE` points to a
+SQLite file loaded with `txt2detection load-cves`.
+
+Vulnerabilities are stored as serialized STIX objects keyed on the upper-case
+CVE id, so a batch of ids is a single indexed lookup.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+
+
+logger = logging.getLogger("txt2detection.cve_store")
+
+# stay below SQLITE_MAX_VARIABLE_NUMBER on old SQLite builds
+QUERY_BATCH_SIZE = 500
+
+
+class CVEStore:
+    def __init__(self, path):
+        self.path = Path(path).expanduser()
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """
+        One connection per thread, sqlite3 connections cannot be shared
+        """
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vulnerabilities (cve_id TEXT PRIMARY KEY, object TEXT NOT NULL) WITHOUT ROWID"
+            )
+            self._local.connection = conn
+        return conn
+
+    def load(self, objects) -> int:
+        """
+        Insert (or replace) every `vulnerability` in `objects`, returns the number of vulnerabilities loaded
+        """
+        rows = (
+            (obj["name"].upper(), json.dumps(obj))
+            for obj in objects
+            if obj.get("type") == "vulnerability" and obj.get("name")
+        )
+        with self.connection as conn:
+            count = conn.total_changes
+            conn.executemany(
+                "INSERT OR REPLACE INTO vulnerabilities (cve_id, object) VALUES (?, ?)",
+                rows,
+            )
+            return conn.total_changes - count
+
+    def load_file(self, path) -> int:
+        """
+        Load a STIX bundle, a JSON list of objects or a file with one object per line
+        """
+        with open(path, "rb") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError:
+                f.seek(0)
+                data = [json.loads(line) for line in f if line.strip()]
+        if isinstance(data, dict):
+            data = data.get("objects", [data])
+        count = self.load(data)
+        logger.info("loaded %d vulnerabilities from %s", count, path)
+        return count
+
+    def get_objects(self, cve_ids) -> list[dict]:
+        cve_ids = list(dict.fromkeys(cve_id.upper() for cve_id in cve_ids))
+        found = {}
+        for i in range(0, len(cve_ids), QUERY_BATCH_SIZE):
+            batch = cve_ids[i : i + QUERY_BATCH_SIZE]
+            found.update(
+                self.connection.execute(
+                    "SELECT cve_id, object FROM vulnerabilities WHERE cve_id IN (%s)"
+                    % ",".join("?" * len(batch)),
+                    batch,
+                )
+            )
+        return [json.loads(found[cve_id]) for cve_id in cve_ids if cve_id in found]
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM vulnerabilities").fetchone()[0]
+
+
+_store: CVEStore = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> CVEStore | None:
+    """
+    Store at `CVE_DATABASE`, None if the variable is not set
+    """
+    global _store
+    path = os.getenv("CVE_DATABASE")
+    if not path:
+        return None
+    path = Path(path).expanduser()
+    if not path.exists():
+        raise FileNotFoundError(
+            f"CVE database {path} does not exist, create it with `load-cves`"
+        )
+    with _store_lock:
+        if _store is None or _store.path != path:
+            _store = CVEStore(path)
+        return _store
@@ -0,0 +1,144 @@
+"""
+Disk cache of ATT&CK and CVE lookups shared between runs and processes.
+
+Entries are the objects returned for one id, stored in a SQLite database in
+the txt2detection cache directory. ATT&CK entries are namespaced by ATT&CK
+version, so they are invalidated when CTI Butler moves to a new release.
+Entries expire after `ENRICHMENT_CACHE_TTL` hours and the least recently used
+entries are evicted once there are more than `ENRICHMENT_CACHE_MAX_ENTRIES`.
+
+The cache is best effort, database errors are logged and treated as misses.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+import sqlite3
+import threading
+import time
+
+from txt2detection import resources
+
+
+logger = logging.getLogger("txt2detection.enrichment_cache")
+
+QUERY_BATCH_SIZE = 500
+
+
+class EnrichmentCache:
+    def __init__(self, path, ttl_seconds=24 * 3600, max_entries=50_000):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "connection", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, value TEXT NOT NULL, stored_at REAL NOT NULL, accessed_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)"
+            )
+            self._local.connection = conn
+        return conn
+
+    def get_many(self, namespace, keys) -> dict[str, list]:
+        """
+        Cached values for the `keys` that are in the cache and not expired
+        """
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        try:
+            with self.connection as conn:
+                for i in range(0, len(keys), QUERY_BATCH_SIZE):
+                    batch = keys[i : i + QUERY_BATCH_SIZE]
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(
+                        conn.execute(
+                            f"SELECT key, value FROM entries WHERE namespace = ? AND key IN ({placeholders}) AND stored_at > ?",
+                            [namespace, *batch, now - self.ttl_seconds],
+                        )
+                    )
+                    conn.execute(
+                        f"UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key IN ({placeholders})",
+                        [now, namespace, *batch],
+                    )
+        except sqlite3.Error as e:
+            logger.warning("enrichment cache lookup failed: %s", e)
+            found = {}
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return {key: json.loads(value) for key, value in found.items()}
+
+    def set_many(self, namespace, values: dict[str, list]):
+        now = time.time()
+        try:
+            with self.connection as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (namespace, key, value, stored_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (namespace, key, json.dumps(value), now, now)
+                        for key, value in values.items()
+                    ],
+                )
+                self._evict(conn, now)
+        except sqlite3.Error as e:
+            logger.warning("enrichment cache update failed: %s", e)
+
+    def _evict(self, conn: sqlite3.Connection, now):
+        conn.execute(
+            "DELETE FROM entries WHERE stored_at <= ?", [now - self.ttl_seconds]
+        )
+        (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if count > self.max_entries:
+            conn.execute(
+                "DELETE FROM entries WHERE (namespace, key) IN (SELECT namespace, key FROM entries ORDER BY accessed_at LIMIT ?)",
+                [count - self.max_entries],
+            )
+
+    def clear(self):
+        with self.connection as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return dict(
+            hits=self.hits,
+            misses=self.misses,
+            hit_rate=self.hits / lookups if lookups else 0.0,
+        )
+
+
+_cache: EnrichmentCache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> EnrichmentCache | None:
+    """
+    Process-wide cache in the txt2detection cache directory, None unless
+    `ENRICHMENT_CACHE` is enabled
+    """
+    global _cache
+    if os.getenv("ENRICHMENT_CACHE", "").lower() not in ["1", "true", "yes"]:
+        return None
+    path = resources.cache_dir() / "enrichment.sqlite"
+    with _cache_lock:
+        if _cache is None or _cache.path != path:
+            _cache = EnrichmentCache(
+                path,
+                ttl_seconds=float(os.getenv("ENRICHMENT_CACHE_TTL") or 24) * 3600,
+                max_entries=int(os.getenv("ENRICHMENT_CACHE_MAX_ENTRIES") or 50_000),
+            )
+        return _cache
@@ -0,0 +1,102 @@
+"""
+Shared HTTP session used for enrichment lookups (CTI Butler, Vulmatch).
+
+Connections are kept alive and pooled per host, requests get a default
+timeout, are retried with exponential backoff on connection errors, 429 and
+5xx responses, and the number of in-flight requests per host is capped.
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+
+
+def _env_number(name, default, type=int):
+    value = os.getenv(name)
+    if not value:
+        return default
+    return type(value)
+
+
+class EnrichmentSession(requests.Session):
+    def __init__(
+        self,
+        timeout: float = None,
+        retries: int = None,
+        backoff_factor: float = None,
+        max_per_host: int = None,
+    ):
+        super().__init__()
+        if timeout is None:
+            timeout = _env_number("ENRICHMENT_HTTP_TIMEOUT", 30, float)
+        # urllib3 rejects a zero timeout, 0 or less waits forever
+        self.timeout = timeout if timeout > 0 else None
+        if retries is None:
+            retries = _env_number("ENRICHMENT_HTTP_RETRIES", 5)
+        if backoff_factor is None:
+            backoff_factor = _env_number("ENRICHMENT_HTTP_BACKOFF", 0.5, float)
+        if max_per_host is None:
+            max_per_host = _env_number("ENRICHMENT_MAX_CONNECTIONS_PER_HOST", 8)
+        if max_per_host < 1:
+            raise ValueError(
+                f"at least one connection per host is needed, got {max_per_host}"
+            )
+        self.max_per_host = max_per_host
+
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_maxsize=self.max_per_host, max_retries=retry)
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        self._host_limits: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def host_limit(self, url) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        with self.host_limit(url):
+            return super().request(method, url, *args, **kwargs)
+
+
+_session: EnrichmentSession = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> EnrichmentSession:
+    """
+    Process-wide session, a new one is created in forked children so that
+    pooled connections are never shared between processes
+    """
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = EnrichmentSession()
+            _session_pid = os.getpid()
+        return _session
+
+
+def reset_session():
+    global _session
+    with _session_lock:
+        if _session:
+            _session.close()
+        _session = None
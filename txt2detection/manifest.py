@@ -0,0 +1,97 @@
+"""
+State of a `sigma-dir` run, used to only convert the rules that were added
+or changed since the previous run.
+
+The manifest records the md5 of every converted sigma rule and the bundle it
+was written to. Rules are hashed once parsed (collections are merged into
+each rule), not as file bytes, so comment and formatting edits are ignored
+as they do not change the bundle. It also records a fingerprint of the options the rules were
+converted with, a run with different options starts from an empty manifest.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+
+
+logger = logging.getLogger("txt2detection.manifest")
+
+MANIFEST_VERSION = 2
+
+
+def rule_md5(rule: dict):
+    return hashlib.md5(
+        json.dumps(rule, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def fingerprint(options: dict):
+    return hashlib.md5(
+        json.dumps(options, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class Manifest:
+    def __init__(self, path, fingerprint):
+        self.path = Path(path)
+        self.fingerprint = fingerprint
+        self.files: dict[str, dict] = {}
+
+    @classmethod
+    def load(cls, path, fingerprint):
+        manifest = cls(path, fingerprint)
+        try:
+            data = json.loads(manifest.path.read_text())
+        except FileNotFoundError:
+            return manifest
+        except ValueError as e:
+            logger.warning(f"ignoring unreadable manifest `{path}`: {e}")
+            return manifest
+        if data.get("version") != MANIFEST_VERSION:
+            logger.info(f"manifest `{path}` has another version, converting all rules")
+        elif data.get("fingerprint") != fingerprint:
+            logger.info("options changed since the last run, converting all rules")
+        else:
+            manifest.files = data["files"]
+        return manifest
+
+    def is_unchanged(self, label, md5):
+        """
+        True if the rule `label` was converted with the same content and its
+        bundle still exists
+        """
+        entry = self.files.get(label)
+        return bool(entry and entry["md5"] == md5 and Path(entry["output"]).exists())
+
+    def record(self, label, md5, result: dict):
+        self.files[label] = dict(
+            md5=md5, report_id=result["report_id"], output=result["output"]
+        )
+
+    def remove_missing(self, labels) -> list[dict]:
+        """
+        Forgets the rules that are not in `labels`, returns their entries
+        """
+        keep = set(labels)
+        removed = [entry for label, entry in self.files.items() if label not in keep]
+        self.files = {
+            label: entry for label, entry in self.files.items() if label in keep
+        }
+        return removed
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(
+            json.dumps(
+                dict(
+                    version=MANIFEST_VERSION,
+                    fingerprint=self.fingerprint,
+                    files=self.files,
+                ),
+                indent=4,
+            )
+        )
+        os.replace(tmp_path, self.path)
@@ -1,9 +1,10 @@
 import enum
+import functools
 import json
 import re
+import threading
 import typing
 import uuid
-import requests
 from slugify import slugify
 from datetime import date as dt_date
 from typing import Any, ClassVar, List, Literal, Optional, Union
@@ -11,14 +12,22 @@ from uuid import UUID
 from stix2extensions import DataSource
 
 import jsonschema
-from pydantic import BaseModel, Field, computed_field, field_validator
+from pydantic import (
+    BaseModel,
+    Field,
+    computed_field,
+    field_validator,
+    model_serializer,
+)
 from pydantic_core import PydanticCustomError, core_schema
-import yaml
 
 from stix2 import (
     MarkingDefinition,
 )
 
+from txt2detection import sigma_yaml
+from txt2detection.resources import SIGMA_JSON_SCHEMA
+
 
 if typing.TYPE_CHECKING:
     from txt2detection.bundler import Bundler
@@ -204,9 +213,7 @@ class BaseDetection(BaseModel):
     level: Level
     _custom_id = None
     _extra_data: dict
-    sigma_json_schema: ClassVar = requests.get(
-        "https://github.com/SigmaHQ/sigma-specification/raw/refs/heads/main/json-schema/sigma-detection-rule-schema.json"
-    ).json()
+    sigma_json_schema: ClassVar = SIGMA_JSON_SCHEMA
 
     def model_post_init(self, __context):
         self.tags = self.tags or []
@@ -254,13 +261,24 @@ class BaseDetection(BaseModel):
             rule.update(date=self.date)
         if getattr(self, "modified", 0):
             rule.update(modified=self.modified)
-        return yaml.dump(rule, sort_keys=False, indent=4)
+        return sigma_yaml.dump(rule, sort_keys=False, indent=4)
 
     def validate_rule_with_json_schema(self, rule):
-        jsonschema.validate(
-            rule,
-            self.sigma_json_schema,
-        )
+        """
+        Raises the same error as `jsonschema.validate()`, the other errors
+        found in `rule` are added to it as notes
+        """
+        errors = self.schema_errors(rule)
+        error = jsonschema.exceptions.best_match(errors)
+        if error is None:
+            return
+        for other in errors:
+            if other is not error:
+                error.add_note(f"{other.json_path}: {other.message}")
+        raise error
+
+    def schema_errors(self, rule) -> list[jsonschema.ValidationError]:
+        return list(get_schema_validator(self.sigma_json_schema).iter_errors(rule))
 
     @property
     def external_references(self):
@@ -290,7 +308,7 @@ class BaseDetection(BaseModel):
         return retval
 
     def make_data_source(self):
-        return DataSource(
+        return make_data_source(
             category=self.logsource.get("category"),
             product=self.logsource.get("product"),
             service=self.logsource.get("service"),
@@ -406,9 +424,52 @@ class DataContainer(BaseModel):
     detections: DetectionContainer
     navigator_layer: dict = Field(default=None)
     observables: list[dict] = Field(default=None)
+    text_observables: list[dict] = Field(default=None)
     cves: dict[str, str] = Field(default_factory=dict)
     attacks: dict[str, str] = Field(default_factory=dict)
 
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        data = handler(self)
+        if self.text_observables is None:
+            # only set with --extract_text_observables, data.json is unchanged otherwise
+            data.pop("text_observables", None)
+        return data
+
+
+_schema_validators: dict[int, tuple] = {}
+_schema_validators_lock = threading.Lock()
+
+
+def get_schema_validator(schema: dict) -> jsonschema.protocols.Validator:
+    """
+    Validator for `schema`, the schema is checked and the validator built
+    once, then shared between rules and threads. A refreshed schema is a new
+    object and gets its own validator.
+    """
+    entry = _schema_validators.get(id(schema))
+    if entry is None or entry[0] is not schema:
+        with _schema_validators_lock:
+            cls = jsonschema.validators.validator_for(schema)
+            cls.check_schema(schema)
+            entry = (schema, cls(schema))
+            _schema_validators[id(schema)] = entry
+    return entry[1]
+
+
+@functools.lru_cache(maxsize=1024)
+def make_data_source(category, product, service, definition) -> DataSource:
+    """
+    The id of a data-source is derived from its properties, so rules sharing
+    a log source share the (immutable) object instead of building it again
+    """
+    return DataSource(
+        category=category,
+        product=product,
+        service=service,
+        definition=definition,
+    )
+
 
 def tlp_from_tags(tags: list[SigmaTag]):
     for tag in tags:
@@ -1,6 +1,8 @@
+import functools
 import re, validators
-from typing import Any, Dict, List
-from stix2 import parse as parse_stix, parse_observable
+import threading
+from typing import IO, Any, Dict, Iterator, List
+from stix2 import parse_observable
 
 # Mapping of key regex patterns to STIX observable types
 STIX_PATTERNS_KEYS = {
@@ -43,7 +45,69 @@ STIX_PATTERNS_VALUES = {
 }
 
 
-def filter_out(type, value: str):
+# filter_out() never accepts these types, so values are not scanned for them
+UNFILTERED_TYPES = {
+    "directory",
+    "hostname",
+    "file.hashes.SSDEEP",
+    "user-account",
+    "x509-certificate",
+}
+
+
+def _group_name(stix_type):
+    return re.sub(r"\W", "_", stix_type)
+
+
+def _alternation(patterns: Dict[str, List[str]]):
+    # one named group per STIX type, `match.lastgroup` maps back to the type
+    return re.compile(
+        "|".join(
+            f"(?P<{_group_name(stix_type)}>{'|'.join(type_patterns)})"
+            for stix_type, type_patterns in patterns.items()
+        ),
+        re.IGNORECASE,
+    )
+
+
+SCANNED_TYPES = [t for t in STIX_PATTERNS_VALUES if t not in UNFILTERED_TYPES]
+GROUP_TYPES = {_group_name(stix_type): stix_type for stix_type in STIX_PATTERNS_VALUES}
+
+VALUE_PATTERN = _alternation({t: STIX_PATTERNS_VALUES[t] for t in SCANNED_TYPES})
+VALUE_PATTERNS = {
+    stix_type: re.compile("|".join(STIX_PATTERNS_VALUES[stix_type]), re.IGNORECASE)
+    for stix_type in SCANNED_TYPES
+}
+
+
+def match_value(value: str) -> List[str]:
+    """
+    STIX types, in the order of `STIX_PATTERNS_VALUES`, whose value pattern
+    matches `value` and that `filter_out()` accepts
+    """
+    first = VALUE_PATTERN.search(value)
+    if not first:
+        return []
+    first_type = GROUP_TYPES[first.lastgroup]
+    return [
+        stix_type
+        for stix_type, pattern in VALUE_PATTERNS.items()
+        if (stix_type == first_type or pattern.search(value))
+        and filter_out(stix_type, value)
+    ]
+
+
+# SCOs and validation results are memoized per process, so an observable
+# seen in many rules or bundles is only validated and built once
+OBSERVABLE_CACHE_SIZE = 8192
+
+
+@functools.lru_cache(maxsize=OBSERVABLE_CACHE_SIZE)
+def filter_out(type, value: str) -> bool:
+    return bool(_validate(type, value))
+
+
+def _validate(type, value: str):
     match type:
         case "ipv4-addr":
             return validators.ipv4(value)
@@ -71,7 +135,6 @@ def filter_out(type, value: str):
             pass
 
         case "windows-registry-key":
-            print(value)
             ns, _, _ = value.partition("\\")
             return ns in [
                 "HKEY_CLASSES_ROOT",
@@ -92,35 +155,144 @@ def filter_out(type, value: str):
     return False
 
 
+def _iter_strings(detection: Any):
+    # yields (link, value) for every string in document order, where `link`
+    # is `(parent link, key or index)`, so paths cost nothing until they are
+    # needed
+    stack = [(None, detection)]
+    while stack:
+        link, node = stack.pop()
+        if isinstance(node, dict):
+            stack.extend(((link, key), value) for key, value in reversed(node.items()))
+        elif isinstance(node, list):
+            stack.extend(((link, i), node[i]) for i in reversed(range(len(node))))
+        elif isinstance(node, str):
+            yield link, node
+
+
+def _path(link) -> tuple:
+    path = []
+    while link:
+        link, key = link
+        path.append(key)
+    return tuple(reversed(path))
+
+
+def iter_stix_observables(detection: Any) -> Iterator[tuple[str, str, tuple]]:
+    """
+    Lazily yields `(stix_type, value, path)` for every observable in
+    `detection`, in document order. `path` is the tuple of keys and list
+    indexes leading to the value. Every node is visited once.
+    """
+    value_types: Dict[str, List[str]] = {}
+    for link, value in _iter_strings(detection):
+        if value not in value_types:
+            value_types[value] = match_value(value)
+        for stix_type in value_types[value]:
+            yield stix_type, value, _path(link)
+
+
 def find_stix_observables(detection: Any, matches: List[str] = None) -> List[str]:
+    """
+    Unique `(stix_type, value)` observables in `detection`, in the order
+    they are first found
+    """
     if matches is None:
         matches = []
 
-    if isinstance(detection, dict):
-        for key, value in detection.items():
-            for stix_type, key_pattern in STIX_PATTERNS_KEYS.items():
-                value_patterns = STIX_PATTERNS_VALUES.get(stix_type, [])
-                if re.search(key_pattern, key, re.IGNORECASE):
-                    for pattern in value_patterns:
-                        if isinstance(value, str) and re.search(
-                            pattern, value, re.IGNORECASE
-                        ):
-                            if filter_out(stix_type, value):
-                                matches.append((stix_type, value))
-                find_stix_observables(value, matches)
-            find_stix_observables(value, matches)
-    elif isinstance(detection, list):
-        for item in detection:
-            find_stix_observables(item, matches)
-    elif isinstance(detection, str):
-        for stix_type, value_patterns in STIX_PATTERNS_VALUES.items():
-            for pattern in value_patterns:
-                if re.search(pattern, detection, re.IGNORECASE):
-                    if filter_out(stix_type, detection):
-                        matches.append((stix_type, detection))
+    seen_values = set()
+    seen = set(matches)
+    for _, value in _iter_strings(detection):
+        if value in seen_values:
+            continue
+        seen_values.add(value)
+        for stix_type in match_value(value):
+            if (stix_type, value) not in seen:
+                seen.add((stix_type, value))
+                matches.append((stix_type, value))
     return matches
 
 
+TEXT_CHUNK_SIZE = 1 << 20
+TEXT_OVERLAP = 4096
+
+# the ipv4-addr and windows-registry-key value patterns match up to the end
+# of a value, in text an address or key ends with the word it is in
+TEXT_PATTERN = _alternation(
+    {
+        **{t: STIX_PATTERNS_VALUES[t] for t in SCANNED_TYPES},
+        "ipv4-addr": [
+            r"\b(?:(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\.){3}"
+            r"(?:25[0-5]|2[0-4][0-9]|[01]?[0-9][0-9]?)\b"
+        ],
+        "windows-registry-key": [r"HK\w{0,2}_[A-Z_]+\\[^\s\"'<>|]*"],
+    }
+)
+
+
+def _read_chunks(source: str | IO[str], chunk_size):
+    if isinstance(source, str):
+        for i in range(0, len(source), chunk_size):
+            yield source[i : i + chunk_size]
+    else:
+        while chunk := source.read(chunk_size):
+            yield chunk
+
+
+def _chunk_end(buffer: str, overlap):
+    # a chunk ends after its last whitespace, the partial word after it is
+    # read again with the next chunk unless it is longer than `overlap`
+    end = max(buffer.rfind(c) for c in " \n\t\r") + 1
+    return max(end, len(buffer) - overlap)
+
+
+# whitespace-separated words with one of the characters every value pattern
+# but the hashes needs (`-` for hyphen-separated MAC addresses), or long
+# enough to be a hash
+CANDIDATE_WORD = re.compile(r"(?<!\S)(?:[^\s.:@\\-]*+[.:@\\-]\S*|\S{32,})")
+
+
+def iter_text_observables(
+    source: str | IO[str],
+    chunk_size=TEXT_CHUNK_SIZE,
+    overlap=TEXT_OVERLAP,
+    stop: threading.Event = None,
+) -> Iterator[tuple[str, str]]:
+    """
+    Lazily yields every unique `(stix_type, value)` observable in free text,
+    in the order they are first found. `source` is a string or a text stream
+    read `chunk_size` characters at a time. Chunks overlap by the partial
+    word at the end of each chunk, words longer than `overlap` characters
+    may be cut. Each value is reported as the first type in
+    `STIX_PATTERNS_VALUES` whose pattern matches it.
+
+    No text pattern matches whitespace, so only the words that may hold an
+    observable are matched against the patterns. Once `stop` is set, the
+    scan ends before the next chunk.
+    """
+    seen = set()
+    pending = ""
+    chunks = _read_chunks(source, chunk_size)
+    chunk = next(chunks, None)
+    while chunk is not None and not (stop and stop.is_set()):
+        buffer = pending + chunk
+        chunk = next(chunks, None)
+        end = len(buffer) if chunk is None else _chunk_end(buffer, overlap)
+        for word in CANDIDATE_WORD.finditer(buffer, 0, end):
+            for match in TEXT_PATTERN.finditer(word.group()):
+                observable = GROUP_TYPES[match.lastgroup], match.group()
+                if observable not in seen:
+                    seen.add(observable)
+                    if filter_out(*observable):
+                        yield observable
+        pending = buffer[end:]
+
+
+def find_text_observables(source: str | IO[str], **kwargs) -> List[tuple[str, str]]:
+    return list(iter_text_observables(source, **kwargs))
+
+
+@functools.lru_cache(maxsize=OBSERVABLE_CACHE_SIZE)
 def to_stix_object(observable_type: str, value):
     match observable_type:
         case (
@@ -159,3 +331,21 @@ def to_stix_object(observable_type: str, value):
                 )
             )
     return None
+
+
+def cache_stats():
+    """
+    Hits, misses, hit rate and size of the `filter_out()` and
+    `to_stix_object()` memos
+    """
+    stats = {}
+    for func in [filter_out, to_stix_object]:
+        info = func.cache_info()
+        lookups = info.hits + info.misses
+        stats[func.__name__] = dict(
+            hits=info.hits,
+            misses=info.misses,
+            hit_rate=info.hits / lookups if lookups else 0.0,
+            size=info.currsize,
+        )
+    return stats
@@ -0,0 +1,210 @@
+"""
+Remote JSON documents (schemas, extension definitions, registries) that
+txt2detection depends on.
+
+Each resource is resolved lazily on first use, in this order:
+
+1. the on-disk cache, if it is younger than `max_age`
+2. the upstream url, revalidated with ETag / If-Modified-Since
+3. the (possibly stale) on-disk cache
+4. the snapshot shipped in `txt2detection/data`
+
+so importing txt2detection never touches the network and air-gapped hosts
+fall back to the shipped snapshot.
+"""
+
+from datetime import UTC, datetime, timedelta
+import json
+import logging
+import os
+from pathlib import Path
+import threading
+
+import requests
+
+
+logger = logging.getLogger("txt2detection.resources")
+
+CACHE_VERSION = 1
+DATA_DIR = Path(__file__).parent / "data"
+DEFAULT_TIMEOUT = 10
+
+
+def cache_dir() -> Path:
+    root = os.getenv("TXT2DETECTION_CACHE_DIR") or Path.home() / ".cache/txt2detection"
+    return Path(root) / f"v{CACHE_VERSION}"
+
+
+def is_offline():
+    return os.getenv("TXT2DETECTION_OFFLINE", "").lower() in ["1", "true", "yes"]
+
+
+def _write_atomic(path: Path, content: str):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    tmp_path.write_text(content)
+    os.replace(tmp_path, path)
+
+
+class CachedResource:
+    """
+    JSON document fetched from `url`, cached on disk as `<name>.json`.
+
+    Can be used as a class attribute, in which case accessing the attribute
+    returns the loaded document.
+
+    If `transform` is passed, it is applied to the upstream document before it
+    is cached, the snapshot must already be in the transformed format.
+    """
+
+    registry: dict[str, "CachedResource"] = {}
+
+    def __init__(
+        self, name, url, snapshot=None, max_age=timedelta(days=1), transform=None
+    ):
+        self.name = name
+        self.url = url
+        self.snapshot = snapshot
+        self.max_age = max_age
+        self.transform = transform
+        self._value = None
+        self._lock = threading.Lock()
+        self.registry[name] = self
+
+    def __get__(self, instance, owner):
+        return self.load()
+
+    @property
+    def path(self):
+        return cache_dir() / f"{self.name}.json"
+
+    @property
+    def meta_path(self):
+        return cache_dir() / f"{self.name}.meta.json"
+
+    def load(self):
+        if self._value is None:
+            with self._lock:
+                if self._value is None:
+                    self._value = self._resolve()
+        return self._value
+
+    def refresh(self):
+        """
+        Revalidate against upstream regardless of cache age, raises on failure
+        """
+        with self._lock:
+            self._value = self._revalidate(self._read_meta())
+        return self._value
+
+    def clear(self):
+        self._value = None
+
+    def _resolve(self):
+        meta = self._read_meta()
+        if meta and not self._is_stale(meta):
+            return self._read_cache()
+        if not is_offline():
+            try:
+                return self._revalidate(meta)
+            except Exception as e:
+                logger.warning("could not fetch %s from %s: %s", self.name, self.url, e)
+        if meta:
+            logger.info("using stale cached copy of %s", self.name)
+            return self._read_cache()
+        return self._read_snapshot()
+
+    def _revalidate(self, meta):
+        headers = {}
+        if meta and self.path.exists():
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        resp = requests.get(self.url, headers=headers, timeout=DEFAULT_TIMEOUT)
+        if resp.status_code == 304:
+            logger.debug("%s not modified upstream", self.name)
+            value = self._read_cache()
+        else:
+            resp.raise_for_status()
+            value = resp.json()
+            if self.transform:
+                value = self.transform(value)
+            _write_atomic(self.path, json.dumps(value))
+            meta = dict(
+                url=self.url,
+                etag=resp.headers.get("ETag"),
+                last_modified=resp.headers.get("Last-Modified"),
+            )
+        meta.update(fetched_at=datetime.now(UTC).isoformat())
+        _write_atomic(self.meta_path, json.dumps(meta))
+        return value
+
+    def _is_stale(self, meta):
+        try:
+            fetched_at = datetime.fromisoformat(meta["fetched_at"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return datetime.now(UTC) - fetched_at > self.max_age
+
+    def _read_meta(self):
+        try:
+            meta = json.loads(self.meta_path.read_text())
+        except (OSError, ValueError):
+            return None
+        if not self.path.exists():
+            return None
+        if meta.get("url") != self.url:
+            # cached from another url, neither revalidated nor used as fallback
+            return None
+        return meta
+
+    def _read_cache(self):
+        return json.loads(self.path.read_text())
+
+    def _read_snapshot(self):
+        if not self.snapshot:
+            raise FileNotFoundError(f"no cached or bundled copy of {self.name}")
+        logger.info("using bundled snapshot of %s", self.name)
+        return json.loads((DATA_DIR / self.snapshot).read_text())
+
+
+SIGMA_JSON_SCHEMA = CachedResource(
+    "sigma-detection-rule-schema",
+    "https://github.com/SigmaHQ/sigma-specification/raw/refs/heads/main/json-schema/sigma-detection-rule-schema.json",
+    snapshot="sigma-detection-rule-schema.json",
+)
+SIGMA_EXTENSION_DEFINITION = CachedResource(
+    "indicator-sigma-rule-extension-definition",
+    "https://github.com/muchdogesec/stix2extensions/raw/refs/heads/main/automodel_generated/extension-definitions/properties/indicator-sigma-rule.json",
+    snapshot="extension-definitions/properties/indicator-sigma-rule.json",
+    max_age=timedelta(days=7),
+)
+DATA_SOURCE_EXTENSION_DEFINITION = CachedResource(
+    "data-source-extension-definition",
+    "https://raw.githubusercontent.com/muchdogesec/stix2extensions/refs/heads/main/automodel_generated/extension-definitions/scos/data-source.json",
+    snapshot="extension-definitions/scos/data-source.json",
+    max_age=timedelta(days=7),
+)
+SPDX_LICENSES = CachedResource(
+    "spdx-licenses",
+    "https://github.com/spdx/license-list-data/raw/refs/heads/main/json/licenses.json",
+    snapshot="spdx-licenses.json",
+    max_age=timedelta(days=30),
+    transform=lambda data: {l["licenseId"]: l["name"] for l in data["licenses"]},
+)
+
+
+def refresh_all():
+    """
+    Revalidate every registered resource against upstream, returns a status per resource
+    """
+    statuses = {}
+    for name, resource in CachedResource.registry.items():
+        try:
+            resource.refresh()
+            statuses[name] = "refreshed"
+        except Exception as e:
+            logger.warning("failed to refresh %s: %s", name, e)
+            statuses[name] = "failed"
+    return statuses
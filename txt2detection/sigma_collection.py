@@ -0,0 +1,113 @@
+"""
+Reads Sigma rules from rule files, rule collections and archives of rules.
+
+A rule file may hold several YAML documents separated by `---`. Collections
+follow the Sigma specification: a document with `action: global` is merged
+into every following rule until a document with `action: reset`, and a
+document with `action: repeat` is merged into the previous rule to make
+another rule. `.zip`, `.tar`, `.tar.gz` and `.tgz` archives are read one
+member at a time.
+
+Everything is read lazily, so memory does not grow with the size of a
+collection or archive.
+"""
+
+import copy
+import tarfile
+from pathlib import Path
+from typing import IO, Iterator
+import zipfile
+
+from txt2detection import sigma_yaml
+
+
+RULE_EXTENSIONS = (".yml", ".yaml")
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+
+
+def is_rule_file(name: str):
+    return name.lower().endswith(RULE_EXTENSIONS)
+
+
+def is_archive(name: str):
+    return name.lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def merge(base: dict, update: dict) -> dict:
+    """
+    Copy of `base` with `update` merged into it, nested mappings are merged
+    and every other value of `update` replaces the one in `base`
+    """
+    merged = copy.deepcopy(base)
+    for key, value in update.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = copy.deepcopy(value)
+    return merged
+
+
+def iter_collection(stream: str | IO) -> Iterator[dict]:
+    """
+    Rules in a single or multi-document YAML stream, with the `global`,
+    `reset` and `repeat` actions of rule collections applied
+    """
+    global_rule = {}
+    previous = None
+    for document in sigma_yaml.load_all(stream):
+        if document is None:
+            continue
+        if not isinstance(document, dict):
+            raise ValueError(
+                f"bad sigma input file. expected object/dict, got {type(document)}."
+            )
+        action = document.pop("action", None)
+        if action == "global":
+            global_rule = document
+        elif action == "reset":
+            global_rule = {}
+        elif action == "repeat":
+            if previous is None:
+                raise ValueError("`action: repeat` must follow a rule")
+            previous = merge(previous, document)
+            yield copy.deepcopy(previous)
+        elif action is None:
+            previous = merge(global_rule, document)
+            yield copy.deepcopy(previous)
+        else:
+            raise ValueError(f"unsupported collection action `{action}`")
+
+
+def iter_sources(path) -> Iterator[tuple[str, IO[bytes]]]:
+    """
+    Name and content of `path`, or of each rule file in it if it is an
+    archive. Members of an archive are named `<archive path>/<member path>`.
+    """
+    path = Path(path)
+    name = path.as_posix()
+    if name.lower().endswith(".zip"):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and is_rule_file(info.filename):
+                    with archive.open(info) as member:
+                        yield f"{name}/{info.filename}", member
+    elif is_archive(name):
+        # stream mode reads members in order without seeking
+        with tarfile.open(path, "r|*") as archive:
+            for info in archive:
+                if info.isfile() and is_rule_file(info.name):
+                    yield f"{name}/{info.name}", archive.extractfile(info)
+    else:
+        with open(path, "rb") as f:
+            yield name, f
+
+
+def iter_rules(path) -> Iterator[tuple[str, dict]]:
+    """
+    Label and content of every rule in `path`. The label is the name of the
+    file the rule is in, followed by `#<n>` for the n-th rule of a file after
+    the first.
+    """
+    for name, stream in iter_sources(path):
+        for i, rule in enumerate(iter_collection(stream), 1):
+            yield (name if i == 1 else f"{name}#{i}"), rule
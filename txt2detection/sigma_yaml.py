@@ -0,0 +1,74 @@
+"""
+YAML loading and dumping of Sigma rules, using the libyaml bindings of PyYAML
+when they are available.
+
+Rules are loaded with `CSafeLoader`, which builds the same objects as
+`SafeLoader`. Rules are dumped with `CDumper`, whose output matches `Dumper`
+except for the line wrapping of double-quoted scalars and the style of empty,
+long or multiline keys. Rules that contain either are dumped again with
+`Dumper`, so the output is always byte-identical to the pure-Python
+implementation.
+
+Set `TXT2DETECTION_PURE_YAML=true` to only use the pure-Python loader and
+dumper.
+"""
+
+import os
+import re
+
+import yaml
+
+
+try:
+    from yaml import CDumper, CSafeLoader
+except ImportError:
+    CDumper = CSafeLoader = None
+
+# a double-quoted key, value or sequence item, may also match inside other
+# scalars, which only costs a second dump
+DOUBLE_QUOTED_SCALAR = re.compile(r'(?:^\s*|: |- )"', re.MULTILINE)
+LINE_BREAKS = re.compile("[\r\n\x85\u2028\u2029]")
+
+
+def is_pure():
+    return CDumper is None or os.getenv("TXT2DETECTION_PURE_YAML", "").lower() in [
+        "1",
+        "true",
+        "yes",
+    ]
+
+
+def _has_complex_key(data):
+    # Dumper writes these keys as `? key`, CDumper as `key:`
+    if isinstance(data, dict):
+        return any(
+            isinstance(key, str)
+            and (not key or len(key) > 100 or LINE_BREAKS.search(key))
+            or _has_complex_key(value)
+            for key, value in data.items()
+        )
+    if isinstance(data, list):
+        return any(map(_has_complex_key, data))
+    return False
+
+
+def load(stream):
+    return yaml.load(stream, Loader=yaml.SafeLoader if is_pure() else CSafeLoader)
+
+
+def load_all(stream):
+    """
+    Lazily loads each document of a `---` separated stream
+    """
+    return yaml.load_all(stream, Loader=yaml.SafeLoader if is_pure() else CSafeLoader)
+
+
+def dump(data, **kwargs) -> str:
+    """
+    Same output as `yaml.dump(data, **kwargs)`
+    """
+    if not is_pure() and not _has_complex_key(data):
+        output = yaml.dump(data, Dumper=CDumper, **kwargs)
+        if not DOUBLE_QUOTED_SCALAR.search(output):
+            return output
+    return yaml.dump(data, **kwargs)
@@ -1,17 +1,19 @@
 from datetime import date, datetime
-from functools import lru_cache
 from types import SimpleNamespace
+import typing
 import uuid
-import requests
-from .ai_extractor import ALL_AI_EXTRACTORS, BaseAIExtractor, ModelError
+from .ai_extractor import ALL_AI_EXTRACTORS, ModelError
 import logging
 
 import enum
 import logging
-import requests
 from stix2 import Identity
 
 from .models import UUID_NAMESPACE
+from .resources import SPDX_LICENSES
+
+if typing.TYPE_CHECKING:
+    from .ai_extractor.base import BaseAIExtractor
 
 
 class DetectionLanguage(SimpleNamespace):
@@ -54,7 +56,7 @@ def make_identity(name, namespace=None, created_by_ref=None, object_marking_refs
     )
 
 
-def validate_token_count(max_tokens, input, extractor: BaseAIExtractor):
+def validate_token_count(max_tokens, input, extractor: "BaseAIExtractor"):
     logging.info("INPUT_TOKEN_LIMIT = %d", max_tokens)
     token_count = extractor.count_tokens(input)
     logging.info("TOKEN COUNT FOR %s: %d", extractor.extractor_name, token_count)
@@ -64,16 +66,21 @@ def validate_token_count(max_tokens, input, extractor: BaseAIExtractor):
         )
 
 
-@lru_cache(maxsize=5)
-def get_licenses(date):
-    resp = requests.get(
-        "https://github.com/spdx/license-list-data/raw/refs/heads/main/json/licenses.json"
-    )
-    return {l["licenseId"]: l["name"] for l in resp.json()["licenses"]}
+def valid_licenses():
+    return SPDX_LICENSES.load()
 
 
-def valid_licenses():
-    return get_licenses(datetime.now().date().isoformat())
+def get_license_id(value: str):
+    """
+    Return the canonical SPDX id for `value` (matched case-insensitively) or None
+    """
+    licenses = valid_licenses()
+    if value in licenses:
+        return value
+    for license_id in licenses:
+        if license_id.lower() == value.lower():
+            return license_id
+    return None
 
 
 def remove_rule_specific_tags(tags):
@@ -85,12 +92,6 @@ def remove_rule_specific_tags(tags):
         labels.append(tag)
     return labels
 
-@lru_cache()
-def load_stix_object_from_url(url):
-    resp = requests.get(url)
-    return resp.json()
-
-
 def as_date(d: "date|datetime"):
     if isinstance(d, datetime):
         return d.date()